@@ -0,0 +1,134 @@
+"""
+Admission control for network probes
+Bounds concurrent SSL/redirect probes per worker and sheds load once the
+expected queue wait passes configured thresholds
+"""
+
+import asyncio
+import contextvars
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.profiling import record_stage
+
+PROBE = "probe"
+DEGRADE = "degrade"
+REJECT = "reject"
+
+# Reservation taken by the current request's PROBE decision (see AdmissionController.decide)
+_reservation = contextvars.ContextVar("probe_reservation", default=None)
+
+
+class _Reservation:
+    __slots__ = ("active",)
+
+    def __init__(self):
+        self.active = True
+
+
+class AdmissionController:
+    """
+    Per-worker probe admission
+
+    Requests ask decide() before probing. While the estimated wait for a
+    probe slot is low they are admitted; past degrade_wait they are scored
+    from lexical features only; past reject_wait (or with max_queue requests
+    already waiting) they are rejected so clients can retry elsewhere.
+
+    A PROBE decision reserves a place until the probe reaches run_probe, so a
+    burst decided in one loop tick (e.g. a batch whose probes start as cache
+    load tasks) is counted before any of its probes has started.
+    """
+
+    def __init__(self, max_concurrent_probes: int = 32, degrade_wait: float = 1.0,
+                 reject_wait: float = 5.0, max_queue: int = 256, retry_after: int = 5,
+                 smoothing: float = 0.2):
+        self.capacity = max_concurrent_probes
+        self.degrade_wait = degrade_wait
+        self.reject_wait = reject_wait
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.smoothing = smoothing
+
+        self.in_flight = 0
+        self.queued = 0
+        self.reserved = 0  # Admitted requests whose probe has not reached run_probe yet
+        self.probe_seconds = 1.0  # EWMA of probe duration, seeded pessimistically
+        self.queue_wait_seconds = 0.0  # EWMA of observed wait for a slot
+        self.counts = {PROBE: 0, DEGRADE: 0, REJECT: 0}
+        self._semaphore = None
+
+    def waiting(self) -> int:
+        """Probes (queued or reserved) that will not find a free slot"""
+        return max(0, self.in_flight + self.queued + self.reserved - self.capacity)
+
+    def estimated_wait(self) -> float:
+        """Seconds a new probe would wait for a free slot"""
+        if self.in_flight + self.queued + self.reserved < self.capacity:
+            return 0.0
+        return (self.waiting() + 1) / self.capacity * self.probe_seconds
+
+    def decide(self) -> str:
+        """
+        Admission decision for one new request
+        PROBE reserves a place for the request; release() drops it if no probe runs
+        """
+        wait = self.estimated_wait()
+        if self.waiting() >= self.max_queue or wait >= self.reject_wait:
+            decision = REJECT
+        elif wait >= self.degrade_wait:
+            decision = DEGRADE
+        else:
+            decision = PROBE
+            self.reserved += 1
+            _reservation.set(_Reservation())
+        self.counts[decision] += 1
+        return decision
+
+    def release(self):
+        """Drop the current request's reservation if its probe never queued (e.g. a shared load)"""
+        reservation = _reservation.get()
+        if reservation is not None and reservation.active:
+            reservation.active = False
+            self.reserved -= 1
+
+    async def run_probe(self, fn, *args):
+        """Run a blocking probe in the threadpool once a slot is free"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.capacity)
+        # Tasks copy the context, so a probe started for an admitted request takes over its reservation
+        self.release()
+        self.queued += 1
+        enqueued = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        waited = time.perf_counter() - enqueued
+        record_stage("probe_queue", waited)
+        self.queue_wait_seconds += self.smoothing * (waited - self.queue_wait_seconds)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await run_in_threadpool(fn, *args)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            elapsed = time.perf_counter() - started
+            self.probe_seconds += self.smoothing * (elapsed - self.probe_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "reserved": self.reserved,
+            "estimated_wait_seconds": round(self.estimated_wait(), 3),
+            "avg_probe_seconds": round(self.probe_seconds, 3),
+            "avg_queue_wait_seconds": round(self.queue_wait_seconds, 3),
+            "admitted": self.counts[PROBE],
+            "degraded": self.counts[DEGRADE],
+            "rejected": self.counts[REJECT],
+        }
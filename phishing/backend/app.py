@@ -3,26 +3,42 @@ PhishGuard AI - Production-Ready Phishing Detection API
 A professional cybersecurity SaaS platform powered by machine learning
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import time
+
+# Taken before the heavier imports so readiness can report the full startup cost
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Header, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel, HttpUrl, validator
+import anyio
+import asyncio
+import hmac
 import ssl
 import socket
 from urllib.parse import urlparse
-import requests
 from datetime import datetime
 import json
 import logging
 import sys
 import os
+import threading
 from pathlib import Path
 
 # Add parent directory to path to import ml_model
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from ml_model.detector import PhishingDetector
+from ml_model.features import extract_lexical_features
+from ml_model.shadow import ShadowEvaluator, load_candidate
+from ml_model.updater import IncrementalUpdater
+from backend.storage import AnalysisStore
+from backend.encoding import FastJSONResponse, dumps
+from backend.admission import AdmissionController, DEGRADE, REJECT
+from backend.cache import ResultCache
+from backend.profiling import Profiler, stage
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -44,8 +60,168 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize ML detector
-detector = PhishingDetector()
+# Initialize ML detector (the model loads during warm-up or on first use)
+detector = PhishingDetector(autoload=False)
+
+
+def get_detector() -> PhishingDetector:
+    """Shared detector with its model loaded"""
+    return detector.ensure_loaded()
+
+
+def _create_analysis_store():
+    """Open the analysis history store configured by DATABASE_URL"""
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./phishguard.db")
+    try:
+        return AnalysisStore(
+            database_url,
+            batch_size=int(os.getenv("ANALYSIS_STORE_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("ANALYSIS_STORE_FLUSH_INTERVAL", "1.0")),
+        )
+    except Exception as e:
+        logger.warning(f"Analysis history disabled: {e}")
+        return None
+
+
+# Initialize analysis history (write-behind, never blocks a request)
+analysis_store = _create_analysis_store()
+
+
+# Initialize per-worker admission control for network probes
+admission = AdmissionController(
+    max_concurrent_probes=int(os.getenv("MAX_CONCURRENT_PROBES", "32")),
+    degrade_wait=float(os.getenv("ADMISSION_DEGRADE_WAIT", "1.0")),
+    reject_wait=float(os.getenv("ADMISSION_REJECT_WAIT", "5.0")),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "256")),
+    retry_after=int(os.getenv("ADMISSION_RETRY_AFTER", "5")),
+)
+
+
+async def _probe_features(url: str) -> dict:
+    """Run the network probes for a URL in a bounded probe slot"""
+    return await admission.run_probe(URLAnalyzer.collect_features, url)
+
+
+# Initialize the probe result cache (hot entries refresh ahead of expiry)
+result_cache = ResultCache(
+    _probe_features,
+    ttl=float(os.getenv("CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")),
+    refresh_ahead=float(os.getenv("CACHE_REFRESH_AHEAD", "0.2")),
+    stale_ttl=float(os.getenv("CACHE_STALE_TTL", "300")),
+    min_hits=int(os.getenv("CACHE_MIN_HITS", "2")),
+    error_ttl=float(os.getenv("CACHE_ERROR_TTL", "60")),
+) if os.getenv("CACHE_ENABLED", "true").lower() == "true" else None
+
+# Initialize opt-in request profiling (stage timings and slow-request capture)
+profiler = Profiler(
+    enabled=os.getenv("PROFILING_ENABLED", "false").lower() == "true",
+    sample_rate=float(os.getenv("PROFILING_SAMPLE_RATE", "0.01")),
+    slow_threshold=float(os.getenv("PROFILING_SLOW_THRESHOLD", "1.0")),
+    max_records=int(os.getenv("PROFILING_MAX_RECORDS", "100")),
+    stack_interval=float(os.getenv("PROFILING_STACK_INTERVAL", "0")),
+)
+
+
+def _create_shadow_evaluator():
+    """Shadow-score a candidate model when SHADOW_MODEL_PATH is set"""
+    candidate_path = os.getenv("SHADOW_MODEL_PATH")
+    if not candidate_path:
+        return None
+    return ShadowEvaluator(
+        detector,
+        lambda: load_candidate(candidate_path),
+        sample_rate=float(os.getenv("SHADOW_SAMPLE_RATE", "0.1")),
+        max_queue=int(os.getenv("SHADOW_MAX_QUEUE", "1000")),
+        name=candidate_path,
+    )
+
+
+# Initialize shadow evaluation (candidate loads and scores on its own thread)
+shadow_evaluator = _create_shadow_evaluator()
+
+# Initialize incremental model updates from analyst feedback
+feedback_updater = IncrementalUpdater(
+    detector,
+    analysis_store,
+    min_examples=int(os.getenv("FEEDBACK_MIN_EXAMPLES", "20")),
+    interval=float(os.getenv("FEEDBACK_UPDATE_INTERVAL", "300")),
+    trees_per_update=int(os.getenv("FEEDBACK_TREES_PER_UPDATE", "10")),
+) if analysis_store is not None else None
+
+
+# Startup progress reported by /health/ready
+startup_state = {
+    "ready": False,
+    "import_seconds": None,
+    "model_load_seconds": None,
+    "warmup_seconds": None,
+    "startup_seconds": None,
+    "error": None,
+}
+
+WARMUP_URL = "https://www.example.com/login"
+
+
+def warm_up():
+    """Load the model, run a warm-up inference and build the probe clients"""
+    started = time.perf_counter()
+    try:
+        get_detector()
+        loaded = time.perf_counter()
+        detector.warm_up(URLAnalyzer.collect_lexical_features(WARMUP_URL))
+        get_http_session()
+        get_ssl_context()
+    except Exception as e:
+        startup_state["error"] = str(e)
+        logger.error(f"Warm-up failed: {e}")
+        return
+    startup_state.update(
+        ready=True,
+        error=None,
+        model_load_seconds=round(loaded - started, 3),
+        warmup_seconds=round(time.perf_counter() - loaded, 3),
+        startup_seconds=round(time.perf_counter() - IMPORT_STARTED, 3),
+    )
+    logger.info(f"Worker ready in {startup_state['startup_seconds']}s")
+
+
+@app.on_event("startup")
+def start_warm_up():
+    """Warm up in the background so liveness answers while the model loads"""
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+@app.on_event("startup")
+def start_profiler():
+    """Start the stack sampler when profiling asks for one"""
+    profiler.start()
+
+
+@app.on_event("startup")
+def start_shadow_evaluator():
+    """Start scoring sampled traffic with the candidate model"""
+    if shadow_evaluator is not None:
+        shadow_evaluator.start()
+
+
+@app.on_event("startup")
+def start_feedback_updater():
+    """Start folding analyst feedback into the model in the background"""
+    if feedback_updater is not None and os.getenv("ENABLE_INCREMENTAL_UPDATES", "true").lower() == "true":
+        feedback_updater.start()
+
+
+@app.on_event("shutdown")
+def close_analysis_store():
+    """Flush pending history records before the worker exits"""
+    if feedback_updater is not None:
+        feedback_updater.stop()
+    profiler.stop()
+    if shadow_evaluator is not None:
+        shadow_evaluator.stop()
+    if analysis_store is not None:
+        analysis_store.close()
 
 # ============================================================================
 # Request/Response Models
@@ -69,6 +245,12 @@ class URLRequest(BaseModel):
         return v
 
 
+class FeedbackRequest(URLRequest):
+    """Analyst-confirmed label for a URL"""
+    is_phishing: bool
+    note: str = None
+
+
 class URLAnalysisResponse(BaseModel):
     """Comprehensive analysis response"""
     url: str
@@ -81,12 +263,58 @@ class URLAnalysisResponse(BaseModel):
     timestamp: str
     flags: list
     recommendations: list
+    analysis_mode: str = "full"
 
 
 # ============================================================================
 # URL Feature Extraction
 # ============================================================================
 
+_http_session = None
+_ssl_context = None
+
+
+def get_http_session():
+    """Shared requests session so redirect probes reuse pooled connections"""
+    global _http_session
+    if _http_session is None:
+        import requests
+        from http.cookiejar import DefaultCookiePolicy
+        from requests.adapters import HTTPAdapter
+        
+        session = requests.Session()
+        # Probes target unrelated sites; never carry cookies between them
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(
+            pool_connections=admission.capacity, pool_maxsize=admission.capacity
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _http_session = session
+    return _http_session
+
+
+def get_ssl_context() -> ssl.SSLContext:
+    """Shared client SSL context (loading the CA bundle per probe costs ~40ms)"""
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def _probe_failed(error: Exception) -> bool:
+    """
+    Whether a probe error says nothing about the site itself
+    Timeouts, DNS and network failures count; certificate errors and a refused
+    HTTPS port are real answers (no valid HTTPS) and do not.
+    """
+    from requests.exceptions import SSLError as RequestsSSLError
+    
+    if isinstance(error, (ssl.SSLError, ssl.CertificateError, ConnectionRefusedError, RequestsSSLError)):
+        return False
+    return isinstance(error, OSError)
+
+
 class URLAnalyzer:
     """Extract features from URLs for analysis"""
     
@@ -97,7 +325,7 @@ class URLAnalyzer:
             parsed = urlparse(url)
             hostname = parsed.netloc
             
-            context = ssl.create_default_context()
+            context = get_ssl_context()
             with socket.create_connection((hostname, 443), timeout=5) as sock:
                 with context.wrap_socket(sock, server_hostname=hostname) as ssock:
                     cert = ssock.getpeercert()
@@ -111,21 +339,23 @@ class URLAnalyzer:
                 "has_ssl": False,
                 "cert_valid": False,
                 "issuer": None,
-                "error": str(e)
+                "error": str(e),
+                "probe_failed": _probe_failed(e),
             }
     
     @staticmethod
     def check_redirects(url: str, max_redirects: int = 5) -> dict:
         """Check for suspicious redirects"""
         try:
-            response = requests.head(url, timeout=5, allow_redirects=False)
+            session = get_http_session()
+            response = session.head(url, timeout=5, allow_redirects=False)
             redirect_count = 0
             redirect_chain = [url]
             
             while response.status_code in [301, 302, 303, 307, 308] and redirect_count < max_redirects:
                 redirect_url = response.headers.get('location')
                 redirect_chain.append(redirect_url)
-                response = requests.head(redirect_url, timeout=5, allow_redirects=False)
+                response = session.head(redirect_url, timeout=5, allow_redirects=False)
                 redirect_count += 1
             
             return {
@@ -138,34 +368,52 @@ class URLAnalyzer:
             return {
                 "has_redirects": False,
                 "redirect_count": 0,
-                "error": str(e)
+                "error": str(e),
+                "probe_failed": _probe_failed(e),
             }
     
     @staticmethod
     def extract_domain_features(url: str) -> dict:
         """Extract domain-based features"""
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
-        
-        features = {
-            "domain": domain,
-            "subdomain_count": domain.count('.') - 1,
-            "has_hyphen": '-' in domain,
-            "has_numbers": any(c.isdigit() for c in domain),
-            "domain_length": len(domain),
-            "is_ip": bool(__import__('re').match(r'^\d+\.\d+\.\d+\.\d+', domain)),
-            "path_length": len(parsed.path),
-            "has_query": bool(parsed.query),
-            "special_chars_in_path": len([c for c in parsed.path if c in '@!$&\'()*+,;=:'])
-        }
-        
-        return features
+        return extract_lexical_features(url)
     
     @staticmethod
     def check_domain_age(domain: str) -> dict:
         """Check approximate domain age using WHOIS (simplified)"""
         # In production, use a proper WHOIS library
         return {"domain_age_suspicious": False}
+    
+    @classmethod
+    def collect_lexical_features(cls, url: str) -> dict:
+        """Features available without network probes (used when shedding load)"""
+        domain_features = cls.extract_domain_features(url)
+        return {
+            **domain_features,
+            "has_ssl": url.startswith("https://"),
+            "has_redirects": False,
+            "redirect_count": 0,
+            **cls.check_domain_age(domain_features['domain'])
+        }
+    
+    @classmethod
+    def collect_features(cls, url: str) -> dict:
+        """Run every analysis stage and merge the results for the model"""
+        with stage("lexical"):
+            domain_features = cls.extract_domain_features(url)
+        with stage("ssl_probe"):
+            ssl_info = cls.get_ssl_info(url)
+        with stage("redirect_probe"):
+            redirects_info = cls.check_redirects(url)
+        domain_age_info = cls.check_domain_age(domain_features['domain'])
+        
+        return {
+            **domain_features,
+            **ssl_info,
+            **redirects_info,
+            **domain_age_info,
+            # Both probes report it; a failure of either makes the result provisional
+            "probe_failed": bool(ssl_info.get("probe_failed") or redirects_info.get("probe_failed")),
+        }
 
 
 # ============================================================================
@@ -184,11 +432,29 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "model_loaded": detector.model is not None
+        "model_loaded": detector.model is not None,
+        "ready": startup_state["ready"]
+    }
+
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the worker process is serving requests"""
+    return {"status": "alive", "uptime_seconds": round(time.perf_counter() - IMPORT_STARTED, 3)}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness probe: 503 until the model is loaded and warmed up"""
+    body = {
+        "status": "ready" if startup_state["ready"] else "starting",
+        **startup_state,
+        "model_version": detector.model_version,
     }
+    return JSONResponse(body, status_code=200 if startup_state["ready"] else 503)
 
 
-@app.post("/api/analyze", response_model=URLAnalysisResponse)
+@app.post("/api/analyze", response_model=URLAnalysisResponse, response_class=FastJSONResponse)
 async def analyze_url(request: URLRequest):
     """
     Analyze a URL for phishing indicators
@@ -200,83 +466,278 @@ async def analyze_url(request: URLRequest):
     - Detailed explanation of findings
     - Risk score and flags
     """
-    try:
-        url = request.url
-        logger.info(f"Analyzing URL: {url}")
-        
-        # Extract features
-        analyzer = URLAnalyzer()
-        domain_features = analyzer.extract_domain_features(url)
-        ssl_info = analyzer.get_ssl_info(url)
-        redirects_info = analyzer.check_redirects(url)
-        domain_age_info = analyzer.check_domain_age(domain_features['domain'])
-        
-        # Prepare feature dict for model
-        features = {
-            **domain_features,
-            **ssl_info,
-            **redirects_info,
-            **domain_age_info
-        }
-        
-        # Get prediction from ML model
-        is_phishing, confidence, risk_score = detector.predict(url, features)
+    url = request.url
+    with profiler.profile("analyze", url=url):
+        try:
+            logger.info(f"Analyzing URL: {url}")
+            
+            # Extract features (probes run off the event loop under admission control)
+            features, mode = await _collect_features_admitted(url)
+            
+            response = _build_responses([(url, features)], [mode])[0]
+            with stage("encode"):
+                return FastJSONResponse(response)
+            
+        except HTTPException:
+            raise
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error analyzing URL: {str(e)}")
+            raise HTTPException(status_code=500, detail="Error analyzing URL. Please try again.")
+
+
+@app.post("/api/batch-analyze", response_class=FastJSONResponse)
+async def batch_analyze(urls: list[str]):
+    """Analyze multiple URLs at once (one model and explanation pass for the batch)"""
+    with profiler.profile("batch_analyze", urls=len(urls)):
+        results = [None] * len(urls)
         
-        # Determine threat level based on confidence
-        if is_phishing:
-            if confidence >= 0.95:
-                threat_level = "CRITICAL"
-            elif confidence >= 0.80:
-                threat_level = "HIGH"
-            elif confidence >= 0.60:
-                threat_level = "MEDIUM"
-            else:
-                threat_level = "LOW"
-        else:
-            threat_level = "LOW"
+        async def collect(i, url):
+            try:
+                url = URLRequest(url=url).url
+                features, mode = await _collect_features_admitted(url)
+                return i, url, features, mode
+            except HTTPException as e:
+                results[i] = {"url": url, "error": e.detail}
+            except Exception as e:
+                results[i] = {"url": url, "error": str(e)}
         
-        # Generate explanation
-        explanation = _generate_explanation(is_phishing, features, confidence)
+        # Probes for the whole batch run concurrently, bounded by admission control
+        analyzed = [item for item in await asyncio.gather(*(collect(i, u) for i, u in enumerate(urls))) if item]
         
-        # Generate flags
-        flags = _extract_flags(features, is_phishing)
+        try:
+            responses = _build_responses(
+                [(url, features) for _, url, features, _ in analyzed],
+                [mode for _, _, _, mode in analyzed],
+            )
+        except Exception as e:
+            logger.error(f"Error analyzing batch: {str(e)}")
+            raise HTTPException(status_code=500, detail="Error analyzing URLs. Please try again.")
+        for (i, _, _, _), response in zip(analyzed, responses):
+            results[i] = response
+        return FastJSONResponse({"results": results, "total": len(urls)})
+
+
+@app.get("/api/admission")
+async def admission_status():
+    """Probe concurrency, queue wait and load-shedding counters for this worker"""
+    return admission.stats()
+
+
+@app.get("/api/drift")
+def feature_drift():
+    """Population stability of served features against the training baseline (this worker)"""
+    monitor = get_detector().drift_monitor
+    if monitor is None:
+        return {"enabled": False, "detail": "No feature baseline for the current model"}
+    return {"enabled": True, "model_version": detector.model_version, **monitor.report()}
+
+
+@app.get("/api/shadow")
+async def shadow_status():
+    """Candidate model disagreement and latency versus the served model (this worker)"""
+    if shadow_evaluator is None:
+        return {"enabled": False}
+    return {"enabled": True, "model_version": detector.model_version, **shadow_evaluator.stats()}
+
+
+@app.get("/api/cache")
+async def cache_status():
+    """Probe result cache hit rate and background refresh counters for this worker"""
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **result_cache.stats()}
+
+
+@app.websocket("/ws/scan")
+async def scan_socket(websocket: WebSocket):
+    """
+    Stream URL verdicts over one connection (browser extension, dashboard)
+    
+    Client messages:
+    - {"type": "scan", "id": "...", "url": "..."}
+    - {"type": "cancel", "id": "..."}
+    
+    Server messages are {"type": "result", "id", "final", ...URLAnalysisResponse}
+    or {"type": "error", "id", "detail"}. Cached URLs get one final result;
+    probed URLs get a provisional lexical result first and the final one later.
+    """
+    await websocket.accept()
+    max_pending = int(os.getenv("WS_MAX_PENDING_SCANS", "100"))
+    pending = {}
+    send_lock = asyncio.Lock()
+    
+    async def send(message: dict):
+        async with send_lock:
+            await websocket.send_text(dumps(message).decode("utf-8"))
+    
+    async def send_result(scan_id, url, features, mode, final=True):
+        response = _build_responses([(url, features)], [mode], record=final)[0]
+        await send({"type": "result", "id": scan_id, "final": final, **response})
+    
+    async def finish(scan_id, url):
+        try:
+            features = await (result_cache.load(url) if result_cache is not None else _probe_features(url))
+            await send_result(scan_id, url, features, "full")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error scanning URL over WebSocket: {str(e)}")
+            await send({"type": "error", "id": scan_id, "detail": "Error analyzing URL. Please try again."})
+        finally:
+            admission.release()
+            # A cancelled scan's id may already belong to a newer scan
+            if pending.get(scan_id) is asyncio.current_task():
+                del pending[scan_id]
+    
+    async def scan(scan_id, raw_url):
+        try:
+            url = URLRequest(url=raw_url).url
+        except ValueError:
+            await send({"type": "error", "id": scan_id, "detail": f"Invalid URL: {raw_url}"})
+            return
         
-        # Generate recommendations
-        recommendations = _generate_recommendations(is_phishing, flags)
+        features = result_cache.get(url) if result_cache is not None else None
+        if features is not None:
+            await send_result(scan_id, url, features, "cached")
+            return
         
-        response = URLAnalysisResponse(
-            url=url,
-            is_phishing=is_phishing,
-            confidence=round(confidence * 100, 2),
-            threat_level=threat_level,
-            threat_description=_get_threat_description(threat_level),
-            risk_score=round(risk_score, 2),
-            explanation=explanation,
-            timestamp=datetime.now().isoformat(),
-            flags=flags,
-            recommendations=recommendations
+        decision = admission.decide()
+        if decision == REJECT:
+            await send({
+                "type": "error", "id": scan_id,
+                "detail": "Server is at capacity. Please retry shortly.",
+                "retry_after": admission.retry_after,
+            })
+            return
+        try:
+            await send_result(scan_id, url, URLAnalyzer.collect_lexical_features(url), "lexical",
+                              final=decision == DEGRADE)
+        except BaseException:
+            admission.release()
+            raise
+        if decision != DEGRADE:
+            pending[scan_id] = asyncio.create_task(finish(scan_id, url))
+    
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                await send({"type": "error", "id": None, "detail": "Messages must be JSON objects"})
+                continue
+            scan_id = message.get("id")
+            if isinstance(scan_id, bool) or not isinstance(scan_id, (str, int)):
+                await send({"type": "error", "id": None, "detail": "Scan id must be a string or integer"})
+                continue
+            if message.get("type") == "cancel":
+                task = pending.pop(scan_id, None)
+                if task is not None:
+                    task.cancel()
+            elif message.get("type") == "scan":
+                if scan_id in pending:
+                    await send({"type": "error", "id": scan_id, "detail": "Scan id already in progress"})
+                elif len(pending) >= max_pending:
+                    await send({"type": "error", "id": scan_id, "detail": "Too many pending scans"})
+                else:
+                    try:
+                        await scan(scan_id, message.get("url", ""))
+                    except WebSocketDisconnect:
+                        raise
+                    except Exception as e:
+                        logger.error(f"Error scanning URL over WebSocket: {str(e)}")
+                        await send({"type": "error", "id": scan_id, "detail": "Error analyzing URL. Please try again."})
+            else:
+                await send({"type": "error", "id": scan_id, "detail": "Unknown message type"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in pending.values():
+            task.cancel()
+
+
+def _require_admin(x_admin_token: str = Header(None)):
+    """Allow admin endpoints only with the configured ADMIN_TOKEN header"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/api/admin/slow-requests", dependencies=[Depends(_require_admin)])
+def slow_requests(limit: int = Query(100, ge=1, le=1000)):
+    """Recent slow-request records with stage breakdowns (newest first)"""
+    return FastJSONResponse({
+        **profiler.stats(),
+        "records": profiler.slow_records(limit),
+    }, headers={"Content-Disposition": 'attachment; filename="slow-requests.json"'})
+
+
+@app.post("/api/feedback", status_code=201, dependencies=[Depends(_require_admin)])
+def submit_feedback(request: FeedbackRequest):
+    """
+    Record an analyst-confirmed label for a URL
+    
+    Features come from the most recent stored analysis of the URL, or from a
+    fresh analysis when it has never been seen. The background updater folds
+    accepted feedback into the model once enough examples accumulate.
+    """
+    store = _require_analysis_store()
+    if not get_detector().backend.supports_partial_update:
+        raise HTTPException(
+            status_code=409,
+            detail=f"The '{detector.backend.name}' model backend does not support feedback updates",
         )
-        
-        return response
-        
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Error analyzing URL: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error analyzing URL. Please try again.")
+    previous = store.lookup_url(request.url, limit=1)
+    if previous and previous[0]["features"]:
+        features = previous[0]["features"]
+    else:
+        # Probe within the worker's admission limits like any other analysis
+        collected = anyio.from_thread.run(_probe_features, request.url)
+        features = {name: collected.get(name) for name in detector.feature_names}
+    
+    feedback_id = store.add_feedback(
+        request.url, request.is_phishing, features, note=request.note
+    )
+    return {
+        "id": feedback_id,
+        "status": "accepted",
+        "pending_examples": feedback_updater.pending() if feedback_updater else None,
+    }
 
 
-@app.post("/api/batch-analyze")
-async def batch_analyze(urls: list[str]):
-    """Analyze multiple URLs at once"""
-    results = []
-    for url in urls:
-        try:
-            result = await analyze_url(URLRequest(url=url))
-            results.append(result)
-        except Exception as e:
-            results.append({"url": url, "error": str(e)})
-    return {"results": results, "total": len(urls)}
+@app.get("/api/feedback/status")
+def feedback_status():
+    """Progress of incremental model updates"""
+    if feedback_updater is None:
+        raise HTTPException(status_code=503, detail="Analysis history is not enabled")
+    return feedback_updater.stats()
+
+
+@app.get("/api/history", dependencies=[Depends(_require_admin)])
+def url_history(url: str, limit: int = Query(10, ge=1, le=1000)):
+    """Previously recorded verdicts for a URL, newest first"""
+    store = _require_analysis_store()
+    records = store.lookup_url(url, limit=limit)
+    return {"url": url, "results": [_format_history_record(r) for r in records]}
+
+
+@app.get("/api/history/domain/{domain}", dependencies=[Depends(_require_admin)])
+def domain_history(domain: str, since: str = None, until: str = None,
+                   limit: int = Query(100, ge=1, le=10000)):
+    """Verdicts recorded for a domain within an optional ISO-8601 time window"""
+    store = _require_analysis_store()
+    records = store.domain_history(
+        domain,
+        since=_parse_timestamp(since),
+        until=_parse_timestamp(until),
+        limit=limit,
+    )
+    return {"domain": domain, "results": [_format_history_record(r) for r in records]}
 
 
 @app.get("/sitemap.xml")
@@ -319,97 +780,251 @@ Sitemap: https://phishguard.ai/sitemap.xml"""
 # Helper Functions
 # ============================================================================
 
-def _generate_explanation(is_phishing: bool, features: dict, confidence: float) -> dict:
-    """Generate detailed explanation of the prediction"""
-    explanation = {"risk_factors": [], "safe_factors": []}
-    
-    # Risk factors
-    if features.get('is_ip'):
-        explanation["risk_factors"].append("Domain is an IP address instead of a proper domain name")
-    
-    if features.get('has_hyphen'):
-        explanation["risk_factors"].append("Domain contains hyphens (common in phishing)")
-    
-    if features.get('subdomain_count', 0) > 3:
-        explanation["risk_factors"].append("Excessive subdomains detected")
-    
-    if not features.get('has_ssl'):
-        explanation["risk_factors"].append("No valid SSL certificate found")
-    
-    if features.get('has_redirects'):
-        explanation["risk_factors"].append(f"Multiple redirects detected ({features.get('redirect_count', 0)} redirects)")
-    
-    if features.get('domain_length', 0) > 40:
-        explanation["risk_factors"].append("Unusually long domain name")
-    
-    # Safe factors
-    if features.get('has_ssl'):
-        explanation["safe_factors"].append("Valid SSL certificate detected")
+# Display text per feature: (when the feature is present/true, when absent/false)
+FEATURE_PHRASES = {
+    'has_ssl': ("Valid SSL certificate detected", "No valid SSL certificate found"),
+    'subdomain_count': ("Subdomain structure ({value:.0f} subdomains)", "No subdomains"),
+    'has_hyphen': ("Domain contains hyphens", "Domain contains no hyphens"),
+    'domain_length': ("Domain name length ({value:.0f} characters)", "Empty domain name"),
+    'is_ip': ("Domain is an IP address instead of a proper domain name", "Uses a proper domain name"),
+    'has_numbers': ("Domain contains digits", "Domain contains no digits"),
+    'path_length': ("URL path length ({value:.0f} characters)", "No URL path"),
+    'has_query': ("URL has query parameters", "URL has no query parameters"),
+    'special_chars_in_path': ("Special characters in URL path ({value:.0f})", "No special characters in URL path"),
+    'has_redirects': ("Redirects detected", "No redirects detected"),
+    'redirect_count': ("Redirect chain ({value:.0f} redirects)", "No redirect chain"),
+    'brand_similarity': ("Domain imitates a protected brand (similarity {value:.2f})", "Domain does not imitate a protected brand"),
+}
+
+# Flags raised when a feature pushes toward phishing: (when present, when absent)
+FEATURE_FLAGS = {
+    'has_ssl': (None, "No SSL certificate"),
+    'subdomain_count': ("Multiple subdomains", None),
+    'has_hyphen': ("Hyphenated domain", None),
+    'is_ip': ("IP-based URL", None),
+    'special_chars_in_path': ("Special characters in URL path", None),
+    'has_redirects': ("Suspicious redirects", None),
+    'redirect_count': ("Suspicious redirects", None),
+    'brand_similarity': ("Brand lookalike domain", None),
+}
+
+# Contributions smaller than this (in probability points) are not reported
+CONTRIBUTION_THRESHOLD = 0.01
+
+
+def _threat_level(is_phishing: bool, confidence: float) -> str:
+    """Determine threat level based on confidence"""
+    if not is_phishing:
+        return "LOW"
+    if confidence >= 0.95:
+        return "CRITICAL"
+    if confidence >= 0.80:
+        return "HIGH"
+    if confidence >= 0.60:
+        return "MEDIUM"
+    return "LOW"
+
+
+async def _collect_features_admitted(url: str) -> tuple:
+    """
+    Collect features for a URL subject to admission control
+    Returns (features, analysis_mode); raises 503 when the request is shed
+    """
+    if result_cache is not None:
+        with stage("cache_lookup"):
+            features = result_cache.get(url)
+        if features is not None:
+            return features, "cached"
+    decision = admission.decide()
+    if decision == REJECT:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at capacity. Please retry shortly.",
+            headers={"Retry-After": str(admission.retry_after)},
+        )
+    if decision == DEGRADE:
+        with stage("lexical"):
+            return URLAnalyzer.collect_lexical_features(url), "lexical"
+    try:
+        with stage("probe_total"):
+            if result_cache is not None:
+                return await result_cache.load(url), "full"
+            return await _probe_features(url), "full"
+    finally:
+        admission.release()
+
+
+def _build_responses(items: list, modes: list = None, record: bool = True) -> list:
+    """
+    Score, explain and record a list of (url, features) pairs in one pass
+    Returns plain dicts shaped like URLAnalysisResponse, ready for FastJSONResponse
+    (record=False skips history, shadow scoring and drift, e.g. for provisional verdicts)
+    """
+    model = get_detector()
+    features_list = [features for _, features in items]
+    modes = modes or ["full"] * len(items)
+    # Lexical-only rows lack probe features and would skew the drift window
+    observe = [record and mode != "lexical" for mode in modes]
+    with stage("predict"):
+        predictions = model.predict_batch(features_list, observe=observe)
+    with stage("explain"):
+        contributions_list = model.explain_batch(features_list)
+    if record and shadow_evaluator is not None:
+        shadow_evaluator.submit(features_list, predictions)
+
     
-    if features.get('domain_length', 0) < 20:
-        explanation["safe_factors"].append("Domain name length is normal")
+    responses = []
+    for (url, features), (is_phishing, confidence, risk_score), contributions, mode in zip(
+        items, predictions, contributions_list, modes
+    ):
+        threat_level = _threat_level(is_phishing, confidence)
+        explanation = _generate_explanation(is_phishing, features, confidence, contributions)
+        flags = _extract_flags(features, contributions)
+        
+        response = {
+            "url": url,
+            "is_phishing": is_phishing,
+            "confidence": round(confidence * 100, 2),
+            "threat_level": threat_level,
+            "threat_description": _get_threat_description(threat_level),
+            "risk_score": round(risk_score, 2),
+            "explanation": explanation,
+            "timestamp": datetime.now().isoformat(),
+            "flags": flags,
+            "recommendations": _generate_recommendations(is_phishing, flags),
+            "analysis_mode": mode
+        }
+        
+        if record and analysis_store is not None:
+            analysis_store.record(
+                url=url,
+                is_phishing=is_phishing,
+                confidence=response["confidence"],
+                risk_score=response["risk_score"],
+                threat_level=threat_level,
+                model_version=model.model_version,
+                features={name: features.get(name) for name in model.feature_names},
+            )
+        responses.append(response)
+    return responses
+
+
+def _generate_explanation(is_phishing: bool, features: dict, confidence: float,
+                          contributions: dict = None) -> dict:
+    """
+    Generate detailed explanation of the prediction
+    Factors are the features whose decision-path contributions moved the
+    model toward (risk) or away from (safe) phishing, largest first
+    """
+    explanation = {"risk_factors": [], "safe_factors": []}
     
-    if not features.get('has_redirects'):
-        explanation["safe_factors"].append("No suspicious redirects detected")
+    for name, contribution in sorted((contributions or {}).items(), key=lambda item: -abs(item[1])):
+        if abs(contribution) < CONTRIBUTION_THRESHOLD or name not in FEATURE_PHRASES:
+            continue
+        value = float(features.get(name) or 0)
+        present, absent = FEATURE_PHRASES[name]
+        text = (present if value else absent).format(value=value)
+        key = "risk_factors" if contribution > 0 else "safe_factors"
+        explanation[key].append(text)
     
+    explanation["contributions"] = {
+        name: round(value, 4) for name, value in (contributions or {}).items()
+    }
     explanation["confidence"] = confidence
     explanation["summary"] = f"This URL appears to be {'phishing' if is_phishing else 'legitimate'} with {confidence*100:.1f}% confidence."
     
     return explanation
 
 
-def _extract_flags(features: dict, is_phishing: bool) -> list:
-    """Extract security flags from URL analysis"""
+def _extract_flags(features: dict, contributions: dict = None) -> list:
+    """Extract security flags for features that pushed the model toward phishing"""
     flags = []
     
-    if features.get('is_ip'):
-        flags.append("IP-based URL")
-    if features.get('has_hyphen'):
-        flags.append("Hyphenated domain")
-    if features.get('subdomain_count', 0) > 3:
-        flags.append("Multiple subdomains")
-    if not features.get('has_ssl'):
-        flags.append("No SSL certificate")
-    if features.get('has_redirects'):
-        flags.append("Suspicious redirects")
-    if features.get('special_chars_in_path'):
-        flags.append("Special characters in URL path")
+    for name, contribution in (contributions or {}).items():
+        if contribution < CONTRIBUTION_THRESHOLD or name not in FEATURE_FLAGS:
+            continue
+        present, absent = FEATURE_FLAGS[name]
+        flag = present if features.get(name) else absent
+        if flag and flag not in flags:
+            flags.append(flag)
     
     return flags
 
 
-def _generate_recommendations(is_phishing: bool, flags: list) -> list:
-    """Generate security recommendations"""
-    recommendations = []
-    
-    if is_phishing:
-        recommendations.append("Do not enter any personal or financial information")
-        recommendations.append("Report this URL to your email provider or IT security team")
-        recommendations.append("Delete any emails containing this link")
-        recommendations.append("Do not download or open any attachments from this source")
-    else:
-        recommendations.append("This URL appears to be safe")
-        recommendations.append("Always verify the sender of unexpected emails before clicking links")
-        recommendations.append("Keep your browser and security software up to date")
-    
-    if "No SSL certificate" in flags:
-        recommendations.append("Avoid entering sensitive information on this website")
-    
-    if "Suspicious redirects" in flags:
-        recommendations.append("Be cautious when clicking this link - it may redirect to malicious content")
-    
-    return recommendations
+PHISHING_RECOMMENDATIONS = (
+    "Do not enter any personal or financial information",
+    "Report this URL to your email provider or IT security team",
+    "Delete any emails containing this link",
+    "Do not download or open any attachments from this source",
+)
+
+SAFE_RECOMMENDATIONS = (
+    "This URL appears to be safe",
+    "Always verify the sender of unexpected emails before clicking links",
+    "Keep your browser and security software up to date",
+)
+
+NO_SSL_RECOMMENDATION = "Avoid entering sensitive information on this website"
+REDIRECT_RECOMMENDATION = "Be cautious when clicking this link - it may redirect to malicious content"
+
+# Every response uses one of these shared, immutable blocks
+RECOMMENDATION_BLOCKS = {
+    (is_phishing, no_ssl, redirects): (
+        (PHISHING_RECOMMENDATIONS if is_phishing else SAFE_RECOMMENDATIONS)
+        + ((NO_SSL_RECOMMENDATION,) if no_ssl else ())
+        + ((REDIRECT_RECOMMENDATION,) if redirects else ())
+    )
+    for is_phishing in (False, True)
+    for no_ssl in (False, True)
+    for redirects in (False, True)
+}
+
+
+def _generate_recommendations(is_phishing: bool, flags: list) -> tuple:
+    """Generate security recommendations (a shared, precomputed tuple)"""
+    return RECOMMENDATION_BLOCKS[(
+        bool(is_phishing),
+        "No SSL certificate" in flags,
+        "Suspicious redirects" in flags,
+    )]
+
+
+def _require_analysis_store() -> AnalysisStore:
+    """Return the analysis store or fail with 503 when history is disabled"""
+    if analysis_store is None:
+        raise HTTPException(status_code=503, detail="Analysis history is not enabled")
+    return analysis_store
+
+
+def _parse_timestamp(value: str):
+    """Convert an ISO-8601 query parameter into epoch seconds"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid timestamp: {value}")
+
+
+def _format_history_record(record: dict) -> dict:
+    """Render a stored analysis for API responses"""
+    return {
+        **record,
+        "analyzed_at": datetime.fromtimestamp(record["analyzed_at"]).isoformat(),
+    }
+
+
+THREAT_DESCRIPTIONS = {
+    "LOW": "Minimal risk. URL appears safe.",
+    "MEDIUM": "Moderate risk detected. Review URL carefully.",
+    "HIGH": "Significant risk indicators. Likely phishing attempt.",
+    "CRITICAL": "Extreme risk. Highly likely to be phishing. Do not interact."
+}
 
 
 def _get_threat_description(threat_level: str) -> str:
     """Get description for threat level"""
-    descriptions = {
-        "LOW": "Minimal risk. URL appears safe.",
-        "MEDIUM": "Moderate risk detected. Review URL carefully.",
-        "HIGH": "Significant risk indicators. Likely phishing attempt.",
-        "CRITICAL": "Extreme risk. Highly likely to be phishing. Do not interact."
-    }
-    return descriptions.get(threat_level, "Unknown threat level")
+    return THREAT_DESCRIPTIONS.get(threat_level, "Unknown threat level")
 
 
 # ============================================================================
@@ -421,6 +1036,7 @@ frontend_path = Path(__file__).parent.parent / "frontend" / "dist"
 if frontend_path.exists():
     app.mount("/", StaticFiles(directory=str(frontend_path), html=True), name="frontend")
 
+startup_state["import_seconds"] = round(time.perf_counter() - IMPORT_STARTED, 3)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,104 @@
+"""
+Response encoding benchmark
+Compares per-response CPU cost of the pydantic + jsonable_encoder path
+against the FastJSONResponse path used by /api/analyze and /api/batch-analyze
+
+Usage:
+    python -m backend.bench_responses [--iterations 5000] [--batch-size 100]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from fastapi.encoders import jsonable_encoder
+
+from backend import app as api
+from backend.encoding import dumps
+from ml_model.features import extract_lexical_features
+
+SAMPLE_URLS = [
+    "https://www.google.com/search?q=phishing",
+    "http://192.168.1.1/login@verify!",
+    "https://secure-paypal-account.example-login.com/update",
+    "https://github.com/",
+]
+
+
+def sample_payloads(count: int) -> list:
+    """Build realistic response payloads without network probes"""
+    items = []
+    for i in range(count):
+        url = SAMPLE_URLS[i % len(SAMPLE_URLS)]
+        features = extract_lexical_features(url)
+        features.update(has_ssl=url.startswith("https"), has_redirects=bool(i % 3), redirect_count=i % 3)
+        items.append((url, features))
+    payloads = api._build_responses(items)
+    if api.analysis_store is not None:
+        api.analysis_store.flush()
+    return payloads
+
+
+def encode_legacy(payload: dict) -> bytes:
+    """Model construction, response_model re-validation, jsonable_encoder, json.dumps"""
+    model = api.URLAnalysisResponse(**payload)
+    validated = api.URLAnalysisResponse.model_validate(model.model_dump())
+    content = jsonable_encoder(validated)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_fast(payload: dict) -> bytes:
+    """Plain dict straight to JSON bytes"""
+    return dumps(payload)
+
+
+def measure(encoder, payloads: list, iterations: int) -> float:
+    """CPU microseconds per encoded response"""
+    start = time.process_time()
+    for i in range(iterations):
+        encoder(payloads[i % len(payloads)])
+    return (time.process_time() - start) * 1e6 / iterations
+
+
+def measure_batch(encoder, payloads: list, iterations: int) -> float:
+    """CPU microseconds per batch response of len(payloads) results"""
+    if encoder is encode_legacy:
+        def encode(batch):
+            return json.dumps(
+                jsonable_encoder({"results": [api.URLAnalysisResponse(**p) for p in batch], "total": len(batch)}),
+                separators=(",", ":"),
+            ).encode("utf-8")
+    else:
+        def encode(batch):
+            return dumps({"results": batch, "total": len(batch)})
+    start = time.process_time()
+    for _ in range(iterations):
+        encode(payloads)
+    return (time.process_time() - start) * 1e6 / iterations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark API response encoding")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    payloads = sample_payloads(args.batch_size)
+    assert json.loads(encode_legacy(payloads[0])) == json.loads(encode_fast(payloads[0]))
+
+    batch_iterations = max(args.iterations // args.batch_size, 10)
+    print(f"{'path':<8} {'single (us)':>12} {'batch of ' + str(args.batch_size) + ' (us)':>20}")
+    for name, encoder in (("legacy", encode_legacy), ("fast", encode_fast)):
+        single = measure(encoder, payloads, args.iterations)
+        batch = measure_batch(encoder, payloads, batch_iterations)
+        print(f"{name:<8} {single:>12.1f} {batch:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Per-worker cache of probe results keyed by canonical URL
+Hot entries are refreshed in the background shortly before they expire
+(refresh-ahead) and may be served briefly past expiry while a refresh runs
+(stale-while-revalidate), so popular URLs never wait on probes
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict
+
+from backend.storage import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("url", "value", "expires_at", "refresh_at", "stale_until", "hits", "refreshing")
+
+    def __init__(self, url, value, expires_at, refresh_at, stale_until):
+        self.url = url
+        self.value = value
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+        self.stale_until = stale_until
+        self.hits = 0
+        self.refreshing = False
+
+
+class ResultCache:
+    """
+    LRU cache in front of an async loader
+
+    Each entry gets a jittered TTL and a jittered refresh point inside the
+    last refresh_ahead fraction of that TTL, so entries stored together do
+    not expire or refresh together. Once an entry has min_hits hits, the
+    first hit past its refresh point starts a background reload; hot entries
+    may also be served up to stale_ttl seconds past expiry while reloading.
+    Cold entries simply expire. At most max_refreshes reloads run at once.
+    Results whose probes failed to reach the site (probe_failed: timeouts,
+    DNS or network errors) live only error_ttl seconds and are never served
+    stale, so a transient failure is retried soon. Certificate errors are
+    real results and are cached normally.
+    """
+
+    def __init__(self, loader, ttl: float = 3600.0, max_entries: int = 10000,
+                 refresh_ahead: float = 0.2, stale_ttl: float = 300.0, min_hits: int = 2,
+                 max_refreshes: int = 8, jitter: float = 0.1, error_ttl: float = 60.0,
+                 clock=time.monotonic):
+        self.loader = loader
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_entries = max_entries
+        self.refresh_ahead = refresh_ahead
+        self.stale_ttl = stale_ttl
+        self.min_hits = min_hits
+        self.max_refreshes = max_refreshes
+        self.jitter = jitter
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._refresh_tasks = set()
+        self.counts = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, url: str):
+        """Cached value for a URL, or None; may schedule a background refresh"""
+        key = canonicalize_url(url)
+        entry = self._entries.get(key)
+        now = self.clock()
+        if entry is not None:
+            hot = entry.hits + 1 >= self.min_hits
+            if now < entry.expires_at or (hot and now < entry.stale_until):
+                entry.hits += 1
+                self._entries.move_to_end(key)
+                if now < entry.expires_at:
+                    self.counts["hits"] += 1
+                else:
+                    self.counts["stale_hits"] += 1
+                if hot and now >= entry.refresh_at:
+                    self._schedule_refresh(key, entry)
+                return dict(entry.value)
+            del self._entries[key]
+        self.counts["misses"] += 1
+        return None
+
+    def put(self, url: str, value: dict):
+        """Store a freshly loaded value"""
+        key = canonicalize_url(url)
+        now = self.clock()
+        failed = bool(value.get("probe_failed"))
+        ttl = (self.error_ttl if failed else self.ttl) * random.uniform(1 - self.jitter, 1)
+        refresh_at = now + ttl * (1 - self.refresh_ahead * random.uniform(0.5, 1))
+        stale_until = now + ttl + (0.0 if failed else self.stale_ttl)
+        self._entries[key] = _Entry(url, dict(value), now + ttl, refresh_at, stale_until)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def load(self, url: str) -> dict:
+        """Run the loader for a missed URL, sharing one load between concurrent callers"""
+        key = canonicalize_url(url)
+        pending = self._loading.get(key)
+        if pending is None:
+            # Shielded so a disconnecting caller does not cancel the load for the others
+            pending = asyncio.ensure_future(self._load(url))
+            self._loading[key] = pending
+            pending.add_done_callback(lambda _: self._loading.pop(key, None))
+        return dict(await asyncio.shield(pending))
+
+    async def _load(self, url: str) -> dict:
+        value = await self.loader(url)
+        self.put(url, value)
+        return value
+
+    def _schedule_refresh(self, key: str, entry: _Entry):
+        if entry.refreshing or len(self._refresh_tasks) >= self.max_refreshes:
+            return
+        entry.refreshing = True
+        task = asyncio.get_running_loop().create_task(self._refresh(key, entry))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, key: str, entry: _Entry):
+        try:
+            value = await self.loader(entry.url)
+        except Exception as e:
+            self.counts["refresh_failures"] += 1
+            logger.warning(f"Background refresh failed for {entry.url}: {e}")
+            entry.refreshing = False
+            return
+        self.counts["refreshes"] += 1
+        # Hit counts restart with the new entry, so URLs that cool off stop refreshing
+        if self._entries.get(key) is entry:
+            self.put(entry.url, value)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.counts["hits"] + self.counts["stale_hits"] + self.counts["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "error_ttl_seconds": self.error_ttl,
+            "refreshing": len(self._refresh_tasks),
+            "hit_rate": round((lookups - self.counts["misses"]) / lookups, 4) if lookups else 0.0,
+            **self.counts,
+        }
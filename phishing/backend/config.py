@@ -13,6 +13,7 @@ API_DESCRIPTION = "Intelligent Phishing Website Detection Platform"
 
 # Security
 SECRET_KEY = "dev-key-change-in-production"
+ADMIN_TOKEN = ""  # X-Admin-Token for /api/admin endpoints (empty disables them)
 ALLOWED_HOSTS = ["localhost", "127.0.0.1", "0.0.0.0"]
 
 # CORS
@@ -26,11 +27,27 @@ CORS_ORIGINS = [
 
 # Database (optional)
 DATABASE_URL = "sqlite:///./phishguard.db"
+ANALYSIS_STORE_BATCH_SIZE = 500  # Rows per write-behind transaction
+ANALYSIS_STORE_FLUSH_INTERVAL = 1.0  # Seconds between history flushes
 
 # ML Model
 MODEL_PATH = "ml_model/phishing_model.pkl"
 SCALER_PATH = "ml_model/scaler.pkl"
 FEATURES_PATH = "ml_model/features.json"
+MODEL_BACKEND = "random_forest"  # random_forest | hist_gradient_boosting | compact_forest
+COMPACT_MODEL_PATH = "ml_model/phishing_model.npz"
+PROTECTED_BRANDS_PATH = "ml_model/brands.txt"  # One brand domain per line
+FEATURE_BASELINE_PATH = "ml_model/feature_baseline.json"  # Training histograms for drift monitoring
+DRIFT_WINDOW = 10000  # Served rows per drift histogram half-life
+SHADOW_MODEL_PATH = ""  # Candidate .pkl/.npz scored off the request path (empty disables)
+SHADOW_SAMPLE_RATE = 0.1  # Fraction of served predictions re-scored by the candidate
+SHADOW_MAX_QUEUE = 1000  # Pending shadow rows before samples are dropped
+
+# Incremental updates from analyst feedback
+ENABLE_INCREMENTAL_UPDATES = True
+FEEDBACK_MIN_EXAMPLES = 20  # Examples needed before an update runs
+FEEDBACK_UPDATE_INTERVAL = 300  # Seconds between update checks
+FEEDBACK_TREES_PER_UPDATE = 10  # Estimators added per update
 
 # Logging
 LOG_LEVEL = "DEBUG"
@@ -43,12 +60,32 @@ REQUESTS_PER_HOUR = 1000
 # Cache
 CACHE_ENABLED = False
 CACHE_TTL = 3600
+CACHE_MAX_ENTRIES = 10000  # Probe results kept per worker
+CACHE_REFRESH_AHEAD = 0.2  # Fraction of TTL before expiry when hot entries refresh
+CACHE_STALE_TTL = 300  # Seconds a hot entry may be served past expiry while refreshing
+CACHE_MIN_HITS = 2  # Hits before an entry counts as hot
+CACHE_ERROR_TTL = 60  # Seconds to keep results whose probes timed out or could not connect
 
 # Features
 ENABLE_BATCH_ANALYSIS = True
 ENABLE_API_DOCS = True
 MAX_BATCH_SIZE = 100
 
+# Admission control (per worker)
+MAX_CONCURRENT_PROBES = 32  # Concurrent SSL/redirect probes
+ADMISSION_DEGRADE_WAIT = 1.0  # Seconds of expected queue wait before lexical-only scoring
+ADMISSION_REJECT_WAIT = 5.0  # Seconds of expected queue wait before 503
+ADMISSION_MAX_QUEUE = 256  # Requests waiting for a probe slot before 503
+ADMISSION_RETRY_AFTER = 5  # Retry-After header on shed requests
+WS_MAX_PENDING_SCANS = 100  # Unfinished scans per WebSocket connection
+
+# Profiling (opt-in)
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.01  # Fraction of profiled requests logged with stage timings
+PROFILING_SLOW_THRESHOLD = 1.0  # Seconds before a request is kept as a slow record
+PROFILING_MAX_RECORDS = 100  # Slow records kept per worker
+PROFILING_STACK_INTERVAL = 0  # Seconds between stack samples (0 disables sampling)
+
 # Timeouts
 REQUEST_TIMEOUT = 30
 MODEL_INFERENCE_TIMEOUT = 5
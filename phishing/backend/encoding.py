@@ -0,0 +1,35 @@
+"""
+Fast JSON encoding for API responses
+Uses orjson when installed and falls back to the standard library
+"""
+
+import json
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    """Serialize plain Python data (dicts, lists, tuples, str, numbers) to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response that encodes already-built payloads directly
+
+    Returning this from an endpoint bypasses FastAPI's response_model
+    re-validation and jsonable_encoder pass, so handlers must only put
+    JSON-native values in the content.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,198 @@
+"""
+Opt-in request profiling
+Records per-stage timings for every profiled request, logs a sample of them,
+keeps full breakdowns of slow requests and can attach stack samples taken
+while a slow request was running
+"""
+
+import contextvars
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_current_profile = contextvars.ContextVar("request_profile", default=None)
+
+# Leaf frames of threads that are blocked waiting for work rather than doing it
+IDLE_LEAF_FILES = frozenset({"threading.py", "selectors.py", "queue.py"})
+
+
+class RequestProfile:
+    """Stage timings collected while one request runs"""
+
+    def __init__(self, name: str, meta: dict):
+        self.name = name
+        self.meta = meta
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat()
+        self.stages = []
+
+    def record(self, stage_name: str, seconds: float):
+        # list.append is atomic, so probe threads can record without a lock
+        self.stages.append((stage_name, seconds))
+
+    def breakdown(self) -> dict:
+        """Milliseconds per stage, summed over repeats and concurrent work"""
+        totals = {}
+        for stage_name, seconds in self.stages:
+            totals[stage_name] = totals.get(stage_name, 0.0) + seconds
+        return {name: round(seconds * 1000, 3) for name, seconds in totals.items()}
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a stage of the current request (no-op when not profiling)"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record(name, time.perf_counter() - start)
+
+
+def record_stage(name: str, seconds: float):
+    """Add an already measured stage to the current request, if profiled"""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(name, seconds)
+
+
+class StackSampler:
+    """
+    Samples every thread's Python stack on an interval into a ring buffer
+
+    Samples are process-wide, so a window also contains stacks from other
+    requests that overlapped it; idle threads are skipped.
+    """
+
+    def __init__(self, interval: float = 0.005, window: float = 60.0, max_depth: int = 40):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = deque(maxlen=max(1, int(window / interval)))
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    stack = self._collapse(frame)
+                    if stack:
+                        self.samples.append((now, stack))
+
+    def _collapse(self, frame) -> str:
+        """Root-to-leaf 'module.function' frames joined by ';' (flame graph format)"""
+        if Path(frame.f_code.co_filename).name in IDLE_LEAF_FILES:
+            return None
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            names.append(f"{Path(frame.f_code.co_filename).stem}.{frame.f_code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def window(self, start: float, end: float, top: int = 25) -> list:
+        """Most frequent stacks sampled between two perf_counter times"""
+        counts = Counter(stack for at, stack in list(self.samples) if start <= at <= end)
+        return [{"stack": stack, "samples": n} for stack, n in counts.most_common(top)]
+
+
+class Profiler:
+    """
+    Per-worker profiling switchboard
+
+    Profiled requests always time their stages (a few perf_counter calls);
+    sample_rate of them are logged, and any request slower than
+    slow_threshold seconds is kept in a bounded list of slow records.
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 0.01,
+                 slow_threshold: float = 1.0, max_records: int = 100,
+                 stack_interval: float = 0.0):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.slow_requests = deque(maxlen=max_records)
+        self.profiled = 0
+        self.sampler = StackSampler(stack_interval) if enabled and stack_interval > 0 else None
+
+    def start(self):
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def stop(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    @contextmanager
+    def profile(self, name: str, **meta):
+        """Profile the enclosed request handling"""
+        if not self.enabled:
+            yield None
+            return
+        profile = RequestProfile(name, meta)
+        token = _current_profile.set(profile)
+        try:
+            yield profile
+        finally:
+            _current_profile.reset(token)
+            self._finish(profile)
+
+    def _finish(self, profile: RequestProfile):
+        ended = time.perf_counter()
+        total = ended - profile.started
+        self.profiled += 1
+        breakdown = profile.breakdown()
+
+        if random.random() < self.sample_rate:
+            stages = " ".join(f"{name}={ms}ms" for name, ms in breakdown.items())
+            logger.info(f"profile {profile.name} total={total * 1000:.1f}ms {stages}")
+
+        if total >= self.slow_threshold:
+            record = {
+                "endpoint": profile.name,
+                "started_at": profile.started_at,
+                "total_ms": round(total * 1000, 3),
+                "stages_ms": breakdown,
+                **profile.meta,
+            }
+            if self.sampler is not None:
+                record["stack_samples"] = self.sampler.window(profile.started, ended)
+            self.slow_requests.append(record)
+            logger.warning(f"Slow request {profile.name}: {record['total_ms']}ms {breakdown}")
+
+    def slow_records(self, limit: int = None) -> list:
+        """Most recent slow-request records, newest first"""
+        records = list(self.slow_requests)[::-1]
+        return records[:limit] if limit else records
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_threshold_seconds": self.slow_threshold,
+            "stack_sampling": self.sampler is not None,
+            "profiled_requests": self.profiled,
+            "slow_requests": len(self.slow_requests),
+        }
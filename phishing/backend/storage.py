@@ -0,0 +1,285 @@
+"""
+Persistent analysis history for PhishGuard AI
+Records every verdict with write-behind batching so the request path never waits on disk
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse, urlunparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    canonical_url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    analyzed_at REAL NOT NULL,
+    is_phishing INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    risk_score REAL NOT NULL,
+    threat_level TEXT NOT NULL,
+    model_version TEXT,
+    features TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_url_time ON analyses (canonical_url, analyzed_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_domain_time ON analyses (domain, analyzed_at);
+CREATE INDEX IF NOT EXISTS idx_analyses_time ON analyses (analyzed_at);
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY,
+    canonical_url TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    is_phishing INTEGER NOT NULL,
+    features TEXT NOT NULL,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_label ON feedback (is_phishing, id);
+"""
+
+INSERT_SQL = """
+INSERT INTO analyses (
+    canonical_url, domain, analyzed_at, is_phishing, confidence,
+    risk_score, threat_level, model_version, features
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+COLUMNS = (
+    "canonical_url", "domain", "analyzed_at", "is_phishing", "confidence",
+    "risk_score", "threat_level", "model_version", "features"
+)
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so equivalent spellings share one history key"""
+    parsed = urlparse(url.strip())
+    scheme = (parsed.scheme or "https").lower()
+    host = (parsed.hostname or "").rstrip(".")
+    netloc = host
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parsed.port}"
+    path = parsed.path if parsed.path not in ("", "/") else ""
+    return urlunparse((scheme, netloc, path, parsed.params, parsed.query, ""))
+
+
+def url_domain(url: str) -> str:
+    """Return the lowercased hostname of a URL"""
+    return (urlparse(url.strip()).hostname or "").rstrip(".")
+
+
+def _sqlite_path(database_url: str) -> str:
+    """Translate a sqlite:/// URL into a filesystem path"""
+    prefix = "sqlite:///"
+    if not database_url.startswith(prefix):
+        raise ValueError(f"Unsupported DATABASE_URL: {database_url}")
+    return database_url[len(prefix):] or ":memory:"
+
+
+class AnalysisStore:
+    """
+    SQLite-backed analysis history
+    Writes are queued and flushed in batches by a background thread
+    """
+
+    def __init__(self, database_url: str, batch_size: int = 500,
+                 flush_interval: float = 1.0, max_pending: int = 100000):
+        self.path = _sqlite_path(database_url)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self._stopped = threading.Event()
+        self._writer = threading.Thread(
+            target=self._run_writer, name="analysis-store-writer", daemon=True
+        )
+        self._writer.start()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def record(self, url: str, is_phishing: bool, confidence: float,
+               risk_score: float, threat_level: str, model_version: str = None,
+               features: dict = None, analyzed_at: float = None) -> bool:
+        """Queue an analysis for persistence; never blocks the caller"""
+        row = (
+            canonicalize_url(url),
+            url_domain(url),
+            analyzed_at if analyzed_at is not None else time.time(),
+            int(bool(is_phishing)),
+            float(confidence),
+            float(risk_score),
+            threat_level,
+            model_version,
+            json.dumps(features, default=str) if features is not None else None,
+        )
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if self._writer.is_alive():
+            self._queue.join()
+            return
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                return
+            self._write_batch(batch)
+
+    def close(self):
+        """Stop the writer thread after flushing pending records"""
+        self._stopped.set()
+        self._writer.join(timeout=5)
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def _run_writer(self):
+        """Background loop that batches queued rows into transactions"""
+        while not self._stopped.is_set():
+            batch = self._drain(block=True)
+            if batch:
+                self._write_batch(batch)
+
+    def _drain(self, block: bool) -> list:
+        """Collect up to batch_size queued rows"""
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write_batch(self, batch: list):
+        """Insert a batch of rows in a single transaction"""
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(INSERT_SQL, batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.error(f"Error writing analysis batch: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    # ------------------------------------------------------------------
+    # Analyst feedback
+    # ------------------------------------------------------------------
+
+    def add_feedback(self, url: str, is_phishing: bool, features: dict,
+                     note: str = None) -> int:
+        """Persist a labeled example immediately and return its id"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO feedback (canonical_url, created_at, is_phishing, features, note) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (canonicalize_url(url), time.time(), int(bool(is_phishing)),
+                 json.dumps(features, default=str), note),
+            )
+        return cursor.lastrowid
+
+    def feedback_after(self, last_id: int, limit: int = 10000) -> list:
+        """Feedback examples newer than a watermark id, oldest first"""
+        return self._feedback_query(
+            "SELECT * FROM feedback WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+        )
+
+    def count_feedback_after(self, last_id: int) -> int:
+        """Number of feedback examples newer than a watermark id"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM feedback WHERE id > ?", (last_id,)
+            ).fetchone()[0]
+
+    def recent_feedback(self, is_phishing: bool, up_to_id: int, limit: int) -> list:
+        """Most recent feedback with a given label, used as replay examples"""
+        return self._feedback_query(
+            "SELECT * FROM feedback WHERE is_phishing = ? AND id <= ? ORDER BY id DESC LIMIT ?",
+            (int(bool(is_phishing)), up_to_id, limit),
+        )
+
+    def _feedback_query(self, sql: str, params: tuple) -> list:
+        """Run a feedback query and decode rows into dicts"""
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "canonical_url": row["canonical_url"],
+                "created_at": row["created_at"],
+                "is_phishing": bool(row["is_phishing"]),
+                "features": json.loads(row["features"]),
+                "note": row["note"],
+            }
+            for row in rows
+        ]
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def lookup_url(self, url: str, limit: int = 10) -> list:
+        """Most recent analyses of a URL, newest first"""
+        return self._query(
+            "SELECT * FROM analyses WHERE canonical_url = ? "
+            "ORDER BY analyzed_at DESC LIMIT ?",
+            (canonicalize_url(url), limit),
+        )
+
+    def domain_history(self, domain: str, since: float = None,
+                       until: float = None, limit: int = 100) -> list:
+        """Analyses for a domain within a time window, newest first"""
+        return self._query(
+            "SELECT * FROM analyses WHERE domain = ? AND analyzed_at >= ? "
+            "AND analyzed_at <= ? ORDER BY analyzed_at DESC LIMIT ?",
+            (
+                domain.lower().rstrip("."),
+                since if since is not None else 0.0,
+                until if until is not None else time.time(),
+                limit,
+            ),
+        )
+
+    def stats(self) -> dict:
+        """Write-behind queue counters"""
+        return {
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+    def _query(self, sql: str, params: tuple) -> list:
+        """Run a read query and decode rows into dicts"""
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        results = []
+        for row in rows:
+            record = {column: row[column] for column in COLUMNS}
+            record["is_phishing"] = bool(record["is_phishing"])
+            record["features"] = json.loads(record["features"]) if record["features"] else None
+            results.append(record)
+        return results
@@ -0,0 +1,210 @@
+"""
+Model backends for the phishing detector
+Each backend wraps one estimator family behind the same fit/predict_proba interface
+"""
+
+import copy
+import logging
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ModelBackend:
+    """
+    Interface implemented by every detector backend
+    Backends are pickled whole, so they must only hold picklable state
+    """
+
+    name = None
+
+    def __init__(self, estimator=None):
+        self.estimator = estimator
+
+    def fit(self, X: np.ndarray, y: np.ndarray):
+        """Train the backend on a feature matrix and 0/1 labels"""
+        raise NotImplementedError
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Return an (n_samples, 2) array of [legitimate, phishing] probabilities"""
+        return self.estimator.predict_proba(X)
+
+    def partial_update(self, X: np.ndarray, y: np.ndarray, n_estimators: int = 10) -> "ModelBackend":
+        """
+        Return a new backend extended with estimators fitted on (X, y) only
+        The current backend is left untouched so it can keep serving
+        """
+        raise NotImplementedError(f"Backend '{self.name}' does not support incremental updates")
+
+    @property
+    def supports_partial_update(self) -> bool:
+        return type(self).partial_update is not ModelBackend.partial_update
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.estimator is not None
+
+
+class RandomForestBackend(ModelBackend):
+    """
+    Random forest backend (the original detector model)
+    Trees are scale-invariant, so no scaler is applied except for legacy models
+    """
+
+    name = "random_forest"
+
+    def __init__(self, estimator=None, scaler=None, **params):
+        super().__init__(estimator)
+        # Only set when wrapping a model trained on StandardScaler output
+        self.scaler = scaler
+        self.params = {
+            "n_estimators": 100,
+            "max_depth": 15,
+            "min_samples_split": 5,
+            "min_samples_leaf": 2,
+            "random_state": 42,
+            "n_jobs": -1,
+            **params,
+        }
+
+    def fit(self, X, y):
+        from sklearn.ensemble import RandomForestClassifier
+
+        self.estimator = RandomForestClassifier(**self.params)
+        self.estimator.fit(X, y)
+        # Single-row inference is slower when joblib dispatches across cores
+        self.estimator.set_params(n_jobs=None)
+        self.scaler = None
+        return self
+
+    def predict_proba(self, X):
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        return self.estimator.predict_proba(X)
+
+    def partial_update(self, X, y, n_estimators=10, max_estimators=300):
+        estimator = copy.deepcopy(self.estimator)
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        # warm_start keeps the existing trees and fits only the new ones on (X, y)
+        estimator.set_params(warm_start=True, n_estimators=len(estimator.estimators_) + n_estimators)
+        estimator.fit(X, y)
+        estimator.set_params(warm_start=False)
+
+        # Past the cap, retire the oldest update trees but never the base forest
+        base = min(self.params["n_estimators"], len(estimator.estimators_))
+        excess = len(estimator.estimators_) - max_estimators
+        if excess > 0:
+            estimator.estimators_ = estimator.estimators_[:base] + estimator.estimators_[base + excess:]
+            estimator.set_params(n_estimators=len(estimator.estimators_))
+
+        updated = RandomForestBackend(estimator=estimator, scaler=self.scaler)
+        updated.params = dict(self.params)
+        return updated
+
+
+class HistGradientBoostingBackend(ModelBackend):
+    """
+    Histogram gradient boosting backend
+    A small ensemble of shallow trees with binned thresholds for faster inference
+    """
+
+    name = "hist_gradient_boosting"
+
+    def __init__(self, estimator=None, **params):
+        super().__init__(estimator)
+        self.params = {
+            "max_iter": 50,
+            "max_leaf_nodes": 15,
+            "learning_rate": 0.1,
+            "early_stopping": False,
+            "random_state": 42,
+            **params,
+        }
+
+    def fit(self, X, y):
+        from sklearn.ensemble import HistGradientBoostingClassifier
+
+        self.estimator = HistGradientBoostingClassifier(**self.params)
+        self.estimator.fit(X, y)
+        return self
+
+    def partial_update(self, X, y, n_estimators=10, max_estimators=None):
+        estimator = copy.deepcopy(self.estimator)
+        min_samples_leaf = estimator.min_samples_leaf
+        # Boosting continues from the current predictions, fitting residuals of (X, y).
+        # Feedback batches are small; with the training min_samples_leaf the new
+        # trees could not split at all and the update would change nothing.
+        estimator.set_params(
+            warm_start=True,
+            max_iter=estimator.n_iter_ + n_estimators,
+            min_samples_leaf=max(1, min(min_samples_leaf, len(X) // 4)),
+        )
+        estimator.fit(X, y)
+        estimator.set_params(warm_start=False, min_samples_leaf=min_samples_leaf)
+        updated = HistGradientBoostingBackend(estimator=estimator)
+        updated.params = dict(self.params)
+        return updated
+
+
+class CompactForestBackend(ModelBackend):
+    """
+    Random forest exported to the compact array format (see ml_model.compact)
+    Loads without sklearn; training fits a random forest and compacts it
+    """
+
+    name = "compact_forest"
+
+    def fit(self, X, y):
+        from ml_model.compact import compact_forest
+
+        forest = RandomForestBackend().fit(X, y)
+        self.estimator = compact_forest(forest.estimator)
+        return self
+
+    def save(self, path):
+        self.estimator.save(path)
+
+    @classmethod
+    def load(cls, path) -> "CompactForestBackend":
+        from ml_model.compact import CompactForest
+
+        return cls(estimator=CompactForest.load(path))
+
+
+BACKENDS = {
+    RandomForestBackend.name: RandomForestBackend,
+    HistGradientBoostingBackend.name: HistGradientBoostingBackend,
+    CompactForestBackend.name: CompactForestBackend,
+}
+
+DEFAULT_BACKEND = RandomForestBackend.name
+
+
+def create_backend(name: str = None, **params) -> ModelBackend:
+    """Instantiate an untrained backend by its registered name"""
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown model backend '{name}'. Available: {', '.join(sorted(BACKENDS))}"
+        )
+    return BACKENDS[name](**params)
+
+
+def wrap_legacy_model(estimator, scaler=None) -> ModelBackend:
+    """Wrap a bare pickled sklearn estimator from before backends existed"""
+    logger.info(f"Wrapping legacy {type(estimator).__name__} model")
+    return RandomForestBackend(estimator=estimator, scaler=scaler)
+
+
+def load_pickled_backend(model_path, scaler_path=None) -> ModelBackend:
+    """Load a joblib-pickled backend, wrapping pre-backend models with their scaler"""
+    import joblib
+
+    loaded = joblib.load(str(model_path))
+    if isinstance(loaded, ModelBackend):
+        return loaded
+    scaler = joblib.load(str(scaler_path)) if scaler_path and Path(scaler_path).exists() else None
+    return wrap_legacy_model(loaded, scaler)
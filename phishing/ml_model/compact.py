@@ -0,0 +1,291 @@
+"""
+Compact forest artifact
+Exports a trained random forest as a few contiguous, narrow-typed arrays that
+load without sklearn and evaluate whole batches with vectorized numpy
+
+Usage:
+    python -m ml_model.compact [--model-dir ml_model] [--output phishing_model.npz]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_VERSION = 1
+LEAF = -1
+
+
+class CompactForest:
+    """
+    Array-encoded forest of binary classification trees
+
+    Nodes of all trees are stored back to back. Child indices are local to
+    their tree (int16), feature ids are int16 (-1 marks a leaf), thresholds
+    are float32 and every node carries its phishing probability.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, tree_offset,
+                 tree_weight, max_depth, n_features, metadata=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int16)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.left = np.ascontiguousarray(left, dtype=np.int16)
+        self.right = np.ascontiguousarray(right, dtype=np.int16)
+        self.value = np.ascontiguousarray(value, dtype=np.float32)
+        self.tree_offset = np.ascontiguousarray(tree_offset, dtype=np.int32)
+        self.tree_weight = np.ascontiguousarray(tree_weight, dtype=np.float32)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.metadata = metadata or {}
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.tree_offset)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            a.nbytes for a in (
+                self.feature, self.threshold, self.left, self.right,
+                self.value, self.tree_offset, self.tree_weight,
+            )
+        )
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """Global leaf index reached in every tree, shape (n_samples, n_trees)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        offsets = self.tree_offset.astype(np.int64)[np.newaxis, :]
+        node = np.repeat(offsets, len(X), axis=0)
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            internal = feature != LEAF
+            if not internal.any():
+                break
+            values = np.take_along_axis(X, np.where(internal, feature, 0), axis=1)
+            go_left = values <= self.threshold[node]
+            child = np.where(go_left, self.left[node], self.right[node]) + offsets
+            node = np.where(internal, child, node)
+        return node
+
+    def contributions(self, X: np.ndarray) -> tuple:
+        """
+        Tree-path decomposition of the phishing probability
+
+        Each split moves the running prediction from the parent's value to the
+        child's; that change is credited to the split feature. Returns
+        (bias, contributions) where bias + contributions.sum(axis=1) equals
+        the predicted phishing probability.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        weights = (self.tree_weight / self.tree_weight.sum())[np.newaxis, :]
+        offsets = self.tree_offset.astype(np.int64)[np.newaxis, :]
+        node = np.repeat(offsets, len(X), axis=0)
+        contributions = np.zeros((len(X), self.n_features), dtype=np.float64)
+        rows = np.repeat(np.arange(len(X))[:, np.newaxis], self.n_trees, axis=1)
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            internal = feature != LEAF
+            if not internal.any():
+                break
+            split_feature = np.where(internal, feature, 0)
+            values = np.take_along_axis(X, split_feature, axis=1)
+            go_left = values <= self.threshold[node]
+            child = np.where(go_left, self.left[node], self.right[node]) + offsets
+            child = np.where(internal, child, node)
+            delta = (self.value[child] - self.value[node]) * weights
+            np.add.at(contributions, (rows[internal], split_feature[internal]), delta[internal])
+            node = child
+        bias = float(self.value[self.tree_offset] @ weights[0])
+        return bias, contributions
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Weighted mean of leaf probabilities, as [legitimate, phishing] columns"""
+        leaf_values = self.value[self.leaves(X)]
+        phishing = leaf_values @ self.tree_weight / self.tree_weight.sum()
+        return np.column_stack([1.0 - phishing, phishing])
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def save(self, path: Path):
+        """Write the forest as an uncompressed .npz artifact"""
+        header = {
+            "format_version": FORMAT_VERSION,
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            **self.metadata,
+        }
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                header=np.frombuffer(json.dumps(header).encode(), dtype=np.uint8),
+                feature=self.feature,
+                threshold=self.threshold,
+                left=self.left,
+                right=self.right,
+                value=self.value,
+                tree_offset=self.tree_offset,
+                tree_weight=self.tree_weight,
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "CompactForest":
+        """Load an artifact written by save()"""
+        with np.load(path) as data:
+            header = json.loads(data["header"].tobytes().decode())
+            if header.get("format_version") != FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported compact forest format {header.get('format_version')} in {path}"
+                )
+            arrays = {
+                name: data[name]
+                for name in ("feature", "threshold", "left", "right", "value",
+                             "tree_offset", "tree_weight")
+            }
+        max_depth = header.pop("max_depth")
+        n_features = header.pop("n_features")
+        header.pop("format_version")
+        return cls(**arrays, max_depth=max_depth, n_features=n_features, metadata=header)
+
+
+# ============================================================================
+# Export
+# ============================================================================
+
+def _collapse(tree, node: int, scaler, nodes: list) -> tuple:
+    """
+    Rebuild a subtree bottom-up, collapsing splits whose leaves agree
+    Returns (local node id, depth, structural key)
+    """
+    counts = tree.value[node][0]
+    phishing = float(counts[1] / counts.sum()) if counts.sum() else 0.0
+
+    if tree.children_left[node] == LEAF:
+        nodes.append([LEAF, 0.0, LEAF, LEAF, phishing])
+        return len(nodes) - 1, 0, ("leaf", np.float32(phishing))
+
+    index = len(nodes)
+    nodes.append(None)
+    left, left_depth, left_key = _collapse(tree, tree.children_left[node], scaler, nodes)
+    right, right_depth, right_key = _collapse(tree, tree.children_right[node], scaler, nodes)
+
+    # Both sides predict the same probability: the split is redundant
+    if left_key[0] == "leaf" and left_key == right_key:
+        del nodes[index:]
+        nodes.append([LEAF, 0.0, LEAF, LEAF, float(left_key[1])])
+        return index, 0, left_key
+
+    feature = int(tree.feature[node])
+    threshold = float(tree.threshold[node])
+    if scaler is not None:
+        # Fold StandardScaler into the split: (x - mean) / scale <= t  <=>  x <= t * scale + mean
+        threshold = threshold * scaler.scale_[feature] + scaler.mean_[feature]
+    nodes[index] = [feature, threshold, left, right, phishing]
+    key = ("split", feature, np.float32(threshold), left_key, right_key)
+    return index, max(left_depth, right_depth) + 1, key
+
+
+def compact_forest(estimator, scaler=None, prune: bool = True, metadata: dict = None) -> CompactForest:
+    """Convert a fitted RandomForestClassifier into a CompactForest"""
+    trees = {}
+    order = []
+    for member in estimator.estimators_:
+        nodes = []
+        _, depth, key = _collapse(member.tree_, 0, scaler, nodes)
+        if len(nodes) > np.iinfo(np.int16).max:
+            raise ValueError("Tree too large for int16 node indices")
+        # Identical trees contribute identically; keep one copy with a weight
+        key = key if prune else len(order)
+        if key in trees:
+            trees[key][2] += 1
+        else:
+            trees[key] = [nodes, depth, 1]
+            order.append(key)
+
+    feature, threshold, left, right, value, offsets, weights = [], [], [], [], [], [], []
+    max_depth = 0
+    for key in order:
+        nodes, depth, weight = trees[key]
+        offsets.append(len(feature))
+        weights.append(weight)
+        max_depth = max(max_depth, depth)
+        for f, t, l, r, v in nodes:
+            feature.append(f)
+            threshold.append(t)
+            left.append(l)
+            right.append(r)
+            value.append(v)
+
+    return CompactForest(
+        feature=np.array(feature), threshold=np.array(threshold),
+        left=np.array(left), right=np.array(right), value=np.array(value),
+        tree_offset=np.array(offsets), tree_weight=np.array(weights),
+        max_depth=max_depth, n_features=estimator.n_features_in_,
+        metadata=metadata,
+    )
+
+
+def export_backend(backend, path: Path, prune: bool = True, source_version: str = None) -> CompactForest:
+    """Export a random forest backend to a compact artifact on disk"""
+    if backend.name != "random_forest":
+        raise ValueError(f"Compact export supports random_forest models, not '{backend.name}'")
+    forest = compact_forest(
+        backend.estimator,
+        scaler=getattr(backend, "scaler", None),
+        prune=prune,
+        metadata={"source_model_version": source_version},
+    )
+    forest.save(path)
+    return forest
+
+
+def main(argv=None):
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    import pickle
+
+    from ml_model.backends import load_pickled_backend
+
+    parser = argparse.ArgumentParser(description="Export a compact forest artifact")
+    parser.add_argument("--model-dir", default=str(Path(__file__).parent))
+    parser.add_argument("--output", help="artifact path (default: <model-dir>/phishing_model.npz)")
+    parser.add_argument("--no-prune", action="store_true", help="keep redundant trees and splits")
+    args = parser.parse_args(argv)
+
+    model_dir = Path(args.model_dir)
+    model_path = model_dir / "phishing_model.pkl"
+    output = Path(args.output) if args.output else model_dir / "phishing_model.npz"
+
+    start = time.perf_counter()
+    backend = load_pickled_backend(model_path, model_dir / "scaler.pkl")
+    pickle_load = time.perf_counter() - start
+
+    source_version = hashlib.sha256(model_path.read_bytes()).hexdigest()[:12]
+    forest = export_backend(backend, output, prune=not args.no_prune, source_version=source_version)
+
+    start = time.perf_counter()
+    CompactForest.load(output)
+    compact_load = time.perf_counter() - start
+
+    original_nodes = sum(t.tree_.node_count for t in backend.estimator.estimators_)
+    print(f"trees:      {len(backend.estimator.estimators_)} -> {forest.n_trees}")
+    print(f"nodes:      {original_nodes} -> {forest.n_nodes}")
+    print(f"size:       {len(pickle.dumps(backend))} bytes pickled -> {forest.nbytes} bytes of arrays")
+    print(f"load time:  {pickle_load * 1000:.1f} ms -> {compact_load * 1000:.1f} ms")
+    print(f"written to  {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Backend comparison report
+Trains every registered model backend on the same data and reports
+inference latency, memory footprint and holdout accuracy
+
+Usage:
+    python -m ml_model.compare_backends [--data features.npz] [--json]
+"""
+
+import argparse
+import json
+import pickle
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml_model.backends import BACKENDS, create_backend
+from ml_model.detector import PhishingDetector
+
+
+def load_dataset(data_path: str = None, seed: int = 42):
+    """Load X/y from an .npz file, or jitter the built-in synthetic set"""
+    if data_path:
+        data = np.load(data_path)
+        return data["X"].astype(float), data["y"].astype(int)
+
+    X, y = PhishingDetector._create_training_data()
+    X = X.astype(float)
+    # The synthetic rows are exact duplicates; add noise to the count-valued
+    # columns so the holdout split is not a trivial lookup
+    rng = np.random.default_rng(seed)
+    count_columns = [1, 3, 6, 8, 10]
+    X[:, count_columns] = np.maximum(
+        X[:, count_columns] + rng.normal(0, 3, size=(len(X), len(count_columns))), 0
+    )
+    return X, y
+
+
+def split_holdout(X, y, test_fraction: float = 0.25, seed: int = 42):
+    """Shuffle and split into train and holdout sets"""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(X))
+    cut = int(len(X) * (1 - test_fraction))
+    train, test = order[:cut], order[cut:]
+    return X[train], y[train], X[test], y[test]
+
+
+def measure_latency(backend, X, repeats: int = 200) -> dict:
+    """Single-row and batch inference latency in microseconds"""
+    single = []
+    for i in range(repeats):
+        row = X[i % len(X)].reshape(1, -1)
+        start = time.perf_counter()
+        backend.predict_proba(row)
+        single.append((time.perf_counter() - start) * 1e6)
+
+    start = time.perf_counter()
+    backend.predict_proba(X)
+    batch_per_row = (time.perf_counter() - start) * 1e6 / len(X)
+
+    single = np.array(single)
+    return {
+        "single_p50_us": round(float(np.percentile(single, 50)), 1),
+        "single_p99_us": round(float(np.percentile(single, 99)), 1),
+        "batch_per_row_us": round(batch_per_row, 2),
+    }
+
+
+def measure_memory(backend) -> dict:
+    """Serialized size and heap cost of loading the backend"""
+    payload = pickle.dumps(backend)
+    tracemalloc.start()
+    pickle.loads(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"pickle_bytes": len(payload), "load_peak_bytes": peak}
+
+
+def evaluate(backend, X_test, y_test) -> dict:
+    """Holdout accuracy, precision and recall for the phishing class"""
+    predictions = backend.predict_proba(X_test).argmax(axis=1)
+    true_positive = int(((predictions == 1) & (y_test == 1)).sum())
+    predicted_positive = int((predictions == 1).sum())
+    actual_positive = int((y_test == 1).sum())
+    return {
+        "accuracy": round(float((predictions == y_test).mean()), 4),
+        "precision": round(true_positive / predicted_positive, 4) if predicted_positive else 0.0,
+        "recall": round(true_positive / actual_positive, 4) if actual_positive else 0.0,
+    }
+
+
+def compare_backends(X, y, names=None) -> list:
+    """Train each backend on the same split and collect its metrics"""
+    X_train, y_train, X_test, y_test = split_holdout(X, y)
+    report = []
+    for name in names or sorted(BACKENDS):
+        backend = create_backend(name)
+        start = time.perf_counter()
+        backend.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+        report.append({
+            "backend": name,
+            "fit_seconds": round(fit_seconds, 3),
+            **measure_latency(backend, X_test),
+            **measure_memory(backend),
+            **evaluate(backend, X_test, y_test),
+        })
+    return report
+
+
+def format_report(report: list) -> str:
+    """Render the comparison as a fixed-width table"""
+    columns = list(report[0].keys())
+    widths = [max(len(c), *(len(str(r[c])) for r in report)) for c in columns]
+    lines = ["  ".join(c.ljust(w) for c, w in zip(columns, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    for row in report:
+        lines.append("  ".join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare phishing model backends")
+    parser.add_argument("--data", help="npz file with X and y arrays")
+    parser.add_argument("--backend", action="append", help="limit to these backends")
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    X, y = load_dataset(args.data)
+    report = compare_backends(X, y, args.backend)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,20 @@ Trained on URL features to classify phishing vs legitimate websites
 """
 
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-import joblib
 from pathlib import Path
+import hashlib
 import json
 import logging
+import os
+import threading
+import time
+
+from ml_model.backends import (
+    CompactForestBackend, ModelBackend, create_backend, load_pickled_backend
+)
+from ml_model.drift import DriftMonitor, FeatureBaseline
+from ml_model.explain import TreeExplainer
+from ml_model.features import FEATURE_NAMES, feature_vector
 
 logger = logging.getLogger(__name__)
 
@@ -18,22 +26,66 @@ class PhishingDetector:
     """
     ML-based phishing detection system
     Analyzes URL features and returns phishing probability
+    
+    The estimator is provided by a pluggable backend selected with the
+    ``backend`` argument or the MODEL_BACKEND environment variable
     """
     
-    def __init__(self):
-        self.model = None
-        self.scaler = None
+    def __init__(self, backend: str = None, model_dir: Path = None, autoload: bool = True):
+        self.backend_name = backend or os.getenv("MODEL_BACKEND") or None
+        self.backend = None
         self.feature_names = None
-        self.model_path = Path(__file__).parent / "phishing_model.pkl"
-        self.scaler_path = Path(__file__).parent / "scaler.pkl"
-        self.features_path = Path(__file__).parent / "features.json"
+        self.model_version = None
+        self._artifact_mtime = None
+        self._explainer = None
+        self._load_lock = threading.Lock()
+        self.drift_monitor = None
+        self._baseline_mtime = None
+        model_dir = Path(model_dir) if model_dir else Path(__file__).parent
+        self.model_path = model_dir / "phishing_model.pkl"
+        self.compact_path = model_dir / "phishing_model.npz"
+        self.scaler_path = model_dir / "scaler.pkl"
+        self.features_path = model_dir / "features.json"
+        self.baseline_path = model_dir / "feature_baseline.json"
         
         # Load or initialize model
-        self._initialize_model()
+        if autoload:
+            self._initialize_model()
+    
+    @property
+    def model(self):
+        """Underlying trained estimator (None until a model is available)"""
+        return self.backend.estimator if self.backend is not None else None
+    
+    @property
+    def artifact_path(self) -> Path:
+        """Model file used by the configured backend"""
+        if self.backend_name == CompactForestBackend.name:
+            return self.compact_path
+        return self.model_path
+    
+    def ensure_loaded(self) -> "PhishingDetector":
+        """Load (or train) the model on first use; safe to call from any thread"""
+        if self.backend is None:
+            with self._load_lock:
+                if self.backend is None:
+                    self._initialize_model()
+        return self
+    
+    def warm_up(self, features: dict) -> float:
+        """
+        Run one prediction and explanation so lazy state (imports, explainer,
+        caches) is built before real traffic; returns the seconds it took
+        """
+        start = time.perf_counter()
+        self.ensure_loaded()
+        self.predict_batch([features])
+        self.explain_batch([features])
+        return time.perf_counter() - start
     
     def _initialize_model(self):
         """Load existing model or create a new one"""
-        if self.model_path.exists():
+        if self.artifact_path.exists() or self.model_path.exists():
             self._load_model()
         else:
             self._create_model()
@@ -45,78 +97,65 @@ class PhishingDetector:
         # Create synthetic training data with realistic phishing indicators
         X_train, y_train = self._create_training_data()
         
-        # Initialize and train model
-        self.model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=15,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        self.scaler = StandardScaler()
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        
-        self.model.fit(X_train_scaled, y_train)
-        self.feature_names = [
-            'has_ssl', 'subdomain_count', 'has_hyphen', 'domain_length',
-            'is_ip', 'has_numbers', 'path_length', 'has_query',
-            'special_chars_in_path', 'has_redirects', 'redirect_count'
-        ]
+        # Initialize and train the configured backend
+        self.backend = create_backend(self.backend_name)
+        self.backend.fit(X_train, y_train)
+        self.feature_names = list(FEATURE_NAMES)
         
         # Save model
         self._save_model()
+        self.save_feature_baseline(X_train)
         logger.info("Model created and trained successfully")
     
-    def _create_training_data(self):
+    @staticmethod
+    def _create_training_data():
         """Create synthetic phishing/legitimate training data"""
         # Legitimate website patterns
         legitimate_samples = [
             # Google
-            [1, 0, 0, 10, 0, 1, 1, 0, 0, 0, 0],
+            [1, 0, 0, 10, 0, 1, 1, 0, 0, 0, 0, 0],
             # Github
-            [1, 0, 0, 10, 0, 0, 5, 1, 0, 0, 0],
+            [1, 0, 0, 10, 0, 0, 5, 1, 0, 0, 0, 0],
             # Amazon
-            [1, 0, 0, 6, 0, 0, 3, 1, 0, 0, 0],
+            [1, 0, 0, 6, 0, 0, 3, 1, 0, 0, 0, 0],
             # Microsoft
-            [1, 1, 0, 11, 0, 0, 2, 0, 0, 0, 0],
+            [1, 1, 0, 11, 0, 0, 2, 0, 0, 0, 0, 0],
             # Facebook
-            [1, 0, 0, 8, 0, 0, 4, 1, 0, 0, 0],
+            [1, 0, 0, 8, 0, 0, 4, 1, 0, 0, 0, 0],
             # Apple
-            [1, 0, 0, 5, 0, 0, 2, 0, 0, 0, 0],
+            [1, 0, 0, 5, 0, 0, 2, 0, 0, 0, 0, 0],
             # Cloudflare
-            [1, 0, 0, 10, 0, 0, 1, 0, 0, 0, 0],
+            [1, 0, 0, 10, 0, 0, 1, 0, 0, 0, 0, 0],
             # Reddit
-            [1, 0, 0, 6, 0, 0, 3, 1, 0, 0, 0],
+            [1, 0, 0, 6, 0, 0, 3, 1, 0, 0, 0, 0],
             # Wikipedia
-            [1, 0, 0, 9, 0, 0, 2, 1, 0, 0, 0],
+            [1, 0, 0, 9, 0, 0, 2, 1, 0, 0, 0, 0],
             # Twitter
-            [1, 0, 0, 7, 0, 0, 2, 0, 0, 0, 0],
+            [1, 0, 0, 7, 0, 0, 2, 0, 0, 0, 0, 0],
         ] * 50  # Duplicate for more training data
         
         # Phishing website patterns
         phishing_samples = [
             # IP-based phishing
-            [0, 0, 0, 15, 1, 1, 25, 1, 3, 1, 2],
-            # Long domain with hyphens
-            [0, 2, 1, 45, 0, 1, 30, 1, 2, 1, 3],
+            [0, 0, 0, 15, 1, 1, 25, 1, 3, 1, 2, 0],
+            # Long domain with hyphens imitating a brand
+            [0, 2, 1, 45, 0, 1, 30, 1, 2, 1, 3, 0.9],
             # Multiple subdomains
-            [0, 4, 0, 35, 0, 0, 20, 1, 1, 1, 2],
-            # Suspicious redirects
-            [0, 1, 1, 30, 0, 1, 15, 1, 2, 1, 4],
+            [0, 4, 0, 35, 0, 0, 20, 1, 1, 1, 2, 0.85],
+            # Suspicious redirects from a brand lookalike
+            [0, 1, 1, 30, 0, 1, 15, 1, 2, 1, 4, 1.0],
             # Special chars in path
-            [0, 1, 0, 25, 0, 1, 40, 1, 5, 1, 2],
+            [0, 1, 0, 25, 0, 1, 40, 1, 5, 1, 2, 0],
             # No SSL + long path
-            [0, 2, 1, 40, 0, 0, 50, 1, 3, 1, 1],
+            [0, 2, 1, 40, 0, 0, 50, 1, 3, 1, 1, 0.8],
             # IP + hyphens
-            [0, 1, 1, 20, 1, 0, 35, 1, 2, 1, 2],
+            [0, 1, 1, 20, 1, 0, 35, 1, 2, 1, 2, 0],
             # Mixed suspicious
-            [0, 3, 1, 33, 0, 1, 28, 1, 3, 1, 3],
+            [0, 3, 1, 33, 0, 1, 28, 1, 3, 1, 3, 1.0],
             # Lots of query params
-            [0, 2, 0, 30, 0, 1, 60, 1, 1, 1, 2],
+            [0, 2, 0, 30, 0, 1, 60, 1, 1, 1, 2, 0],
             # Redirect chains
-            [0, 0, 0, 22, 0, 0, 18, 1, 0, 1, 5],
+            [0, 0, 0, 22, 0, 0, 18, 1, 0, 1, 5, 0],
         ] * 50
         
         X = np.array(legitimate_samples + phishing_samples)
@@ -136,39 +175,67 @@ class PhishingDetector:
         
         if feature_vector is None:
             return False, 0.5, 0.5
+        if self.drift_monitor is not None:
+            self.drift_monitor.observe(feature_vector)
         
-        # Scale features
-        feature_vector_scaled = self.scaler.transform([feature_vector])
-        
-        # Get prediction
-        prediction = self.model.predict(feature_vector_scaled)[0]
-        confidence = max(self.model.predict_proba(feature_vector_scaled)[0])
+        # Get prediction (a single predict_proba call yields both label and confidence)
+        probabilities = self.backend.predict_proba(feature_vector.reshape(1, -1))[0]
+        confidence = float(probabilities.max())
+        is_phishing = bool(probabilities.argmax() == 1)
         
         # Calculate risk score (0-1)
         risk_score = self._calculate_risk_score(features)
         
-        is_phishing = prediction == 1
-        
         return is_phishing, confidence, risk_score
     
+    def predict_batch(self, features_list: list, observe: list = None) -> list:
+        """
+        Predict many URLs with one model call
+        observe holds one flag per row saying whether it feeds the drift
+        monitor (default all rows)
+        
+        Returns:
+            list of (is_phishing, confidence, risk_score)
+        """
+        if not features_list:
+            return []
+        X = np.vstack([feature_vector(f, self.feature_names) for f in features_list])
+        probabilities = self.backend.predict_proba(X)
+        if self.drift_monitor is not None:
+            observed = X if observe is None else X[np.asarray(observe, dtype=bool)]
+            if len(observed):
+                self.drift_monitor.observe(observed)
+        return [
+            (bool(p.argmax() == 1), float(p.max()), self._calculate_risk_score(f))
+            for p, f in zip(probabilities, features_list)
+        ]
+    
+    @property
+    def explainer(self):
+        """Contribution explainer for the current backend (rebuilt after a model swap)"""
+        explainer = self._explainer
+        if explainer is None or explainer[0] is not self.backend:
+            backend = self.backend
+            explainer = (backend, TreeExplainer.from_backend(backend, self.feature_names or FEATURE_NAMES))
+            self._explainer = explainer
+        return explainer[1]
+    
+    def explain_batch(self, features_list: list) -> list:
+        """
+        Per-feature contributions to the phishing probability for each URL
+        Returns None entries when the backend has no tree structure to decompose
+        """
+        explainer = self.explainer
+        if explainer is None or not features_list:
+            return [None] * len(features_list)
+        X = np.vstack([feature_vector(f, self.feature_names) for f in features_list])
+        return explainer.explain(X)
+    
     def _create_feature_vector(self, features: dict) -> np.ndarray:
         """Convert feature dict to feature vector"""
         try:
-            # Map features in the correct order
-            feature_vector = [
-                1 if features.get('has_ssl') else 0,
-                features.get('subdomain_count', 0),
-                1 if features.get('has_hyphen') else 0,
-                features.get('domain_length', 0),
-                1 if features.get('is_ip') else 0,
-                1 if features.get('has_numbers') else 0,
-                features.get('path_length', 0),
-                1 if features.get('has_query') else 0,
-                features.get('special_chars_in_path', 0),
-                1 if features.get('has_redirects') else 0,
-                features.get('redirect_count', 0),
-            ]
-            return np.array(feature_vector, dtype=float)
+            # Map features in the order the model was trained on
+            return feature_vector(features, self.feature_names)
         except Exception as e:
             logger.error(f"Error creating feature vector: {e}")
             return None
@@ -193,29 +260,141 @@ class PhishingDetector:
             score += 1.0
         if features.get('special_chars_in_path', 0) > 3:
             score += 1.5
+        if features.get('brand_similarity', 0) >= 0.8:
+            score += 2.5
         
         # Normalize to 0-1
         return min(score / max_score, 1.0)
     
+    def publish(self, backend: ModelBackend, feature_names: list = None):
+        """Install a newly trained backend and persist it for other workers"""
+        self.backend_name = backend.name
+        self.feature_names = list(feature_names or FEATURE_NAMES)
+        self.backend = backend
+        self._save_model()
+    
     def _save_model(self):
-        """Save model to disk"""
+        """Save model to disk (each file is replaced atomically)"""
         try:
-            joblib.dump(self.model, str(self.model_path))
-            joblib.dump(self.scaler, str(self.scaler_path))
-            with open(self.features_path, 'w') as f:
-                json.dump(self.feature_names, f)
+            if isinstance(self.backend, CompactForestBackend):
+                self._replace_file(self.compact_path, self.backend.save)
+            else:
+                import joblib
+                
+                self._replace_file(self.model_path, lambda p: joblib.dump(self.backend, str(p)))
+            self._replace_file(
+                self.features_path,
+                lambda p: p.write_text(json.dumps(self.feature_names))
+            )
+            self.model_version = self._compute_model_version()
+            self._artifact_mtime = self.artifact_path.stat().st_mtime_ns
             logger.info(f"Model saved to {self.model_path}")
         except Exception as e:
             logger.error(f"Error saving model: {e}")
     
+    def save_feature_baseline(self, X: np.ndarray):
+        """Save training-time feature histograms for drift monitoring"""
+        try:
+            baseline = FeatureBaseline.from_matrix(X, self.feature_names)
+            self._replace_file(self.baseline_path, baseline.save)
+            self._load_drift_monitor()
+        except Exception as e:
+            logger.error(f"Error saving feature baseline: {e}")
+    
+    def _load_drift_monitor(self):
+        """Monitor served features against the saved baseline, if it matches the model"""
+        try:
+            mtime = self.baseline_path.stat().st_mtime_ns
+        except OSError:
+            self.drift_monitor, self._baseline_mtime = None, None
+            return
+        if mtime == self._baseline_mtime and self.drift_monitor is not None:
+            return
+        try:
+            baseline = FeatureBaseline.load(self.baseline_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Drift monitoring disabled, cannot read {self.baseline_path}: {e}")
+            self.drift_monitor = None
+            return
+        if baseline.feature_names != self.feature_names:
+            logger.warning("Feature baseline does not match the model features; drift monitoring disabled")
+            self.drift_monitor = None
+            return
+        self.drift_monitor = DriftMonitor(baseline, window=int(os.getenv("DRIFT_WINDOW", "10000")))
+        self._baseline_mtime = mtime
+    
+    def reload_if_changed(self) -> bool:
+        """Load the saved model again if another process has published a new one"""
+        try:
+            mtime = self.artifact_path.stat().st_mtime_ns
+        except OSError:
+            return False
+        if mtime == self._artifact_mtime:
+            return False
+        logger.info(f"Model file changed on disk; reloading {self.artifact_path}")
+        self._load_model()
+        return True
+    
+    @staticmethod
+    def _replace_file(path: Path, write):
+        """Write to a temporary sibling, then rename over the target"""
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    
     def _load_model(self):
-        """Load model from disk"""
+        """
+        Load model from disk
+        
+        An unreadable pickle is replaced by a freshly trained model, but compact
+        export and load errors propagate: the compact artifact is a deployment
+        step, and silently serving a synthetic model in its place would hide it.
+        A saved model from another backend than the configured one is an error
+        too; it may be a trained model, so it is never overwritten.
+        """
+        if self.backend_name == CompactForestBackend.name:
+            backend = self._load_compact_model()
+        else:
+            backend = None
         try:
-            self.model = joblib.load(str(self.model_path))
-            self.scaler = joblib.load(str(self.scaler_path))
+            if backend is None:
+                backend = self._load_pickled_model()
             with open(self.features_path, 'r') as f:
-                self.feature_names = json.load(f)
-            logger.info(f"Model loaded from {self.model_path}")
+                feature_names = json.load(f)
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             self._create_model()
+            return
+        
+        if self.backend_name and backend.name != self.backend_name:
+            raise ValueError(
+                f"Saved model {self.artifact_path} uses backend '{backend.name}' but "
+                f"MODEL_BACKEND is '{self.backend_name}'; retrain it with "
+                f"'python -m ml_model.train --backend {self.backend_name}' or fix MODEL_BACKEND"
+            )
+        self._artifact_mtime = self.artifact_path.stat().st_mtime_ns
+        self.backend, self.feature_names = backend, feature_names
+        self.model_version = self._compute_model_version()
+        self._load_drift_monitor()
+        logger.info(f"Model loaded from {self.model_path}")
+    
+    def _load_pickled_model(self) -> ModelBackend:
+        """Load a joblib-pickled backend, wrapping pre-backend models"""
+        return load_pickled_backend(self.model_path, self.scaler_path)
+    
+    def _load_compact_model(self) -> ModelBackend:
+        """Load the compact artifact, exporting it from the pickled forest if missing"""
+        if not self.compact_path.exists():
+            from ml_model.compact import export_backend
+            
+            logger.info(f"Exporting compact model to {self.compact_path}")
+            export_backend(self._load_pickled_model(), self.compact_path)
+        return CompactForestBackend.load(self.compact_path)
+    
+    def _compute_model_version(self) -> str:
+        """Short content hash of the saved model, recorded with each verdict"""
+        try:
+            digest = hashlib.sha256(self.artifact_path.read_bytes()).hexdigest()
+            return digest[:12]
+        except OSError:
+            return "unsaved"
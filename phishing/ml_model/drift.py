@@ -0,0 +1,176 @@
+"""
+Online feature-drift monitoring
+Training-time feature histograms are saved next to features.json; served
+feature vectors update fixed-size histograms over the same bins, and the
+population stability index (PSI) compares the two per feature
+"""
+
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+BASELINE_VERSION = 1
+
+# Conventional PSI bands
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+_EPSILON = 1e-4
+
+
+def _bin_edges(column: np.ndarray, bins: int) -> np.ndarray:
+    """
+    Bin edges for one training column
+
+    A value falls in bin i when i edges are strictly below it. Discrete
+    columns use their observed values as edges (one bin per value); others
+    use quantile cut points plus the maximum. Either way, values above
+    anything seen in training land in a final overflow bin.
+    """
+    values = np.unique(column)
+    if len(values) <= bins:
+        return values if len(values) else np.zeros(1)
+    quantiles = np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1])
+    return np.unique(np.append(quantiles, values[-1]))
+
+
+class FeatureBaseline:
+    """Per-feature bin edges and training-time bin proportions"""
+
+    def __init__(self, feature_names: list, edges: list, proportions: list, rows: int):
+        self.feature_names = list(feature_names)
+        self.edges = [np.asarray(e, dtype=float) for e in edges]
+        self.proportions = [np.asarray(p, dtype=float) for p in proportions]
+        self.rows = rows
+
+    @classmethod
+    def from_matrix(cls, X: np.ndarray, feature_names: list, bins: int = 10) -> "FeatureBaseline":
+        """Build a baseline from the training feature matrix"""
+        X = np.asarray(X, dtype=float)
+        edges = [_bin_edges(X[:, i], bins) for i in range(X.shape[1])]
+        binner = HistogramBinner(edges)
+        counts = binner.counts(X)
+        proportions = [row[:len(e) + 1] / max(len(X), 1) for row, e in zip(counts, edges)]
+        return cls(feature_names, edges, proportions, len(X))
+
+    def save(self, path):
+        Path(path).write_text(json.dumps({
+            "version": BASELINE_VERSION,
+            "rows": self.rows,
+            "features": {
+                name: {"edges": e.tolist(), "proportions": p.round(6).tolist()}
+                for name, e, p in zip(self.feature_names, self.edges, self.proportions)
+            },
+        }))
+
+    @classmethod
+    def load(cls, path) -> "FeatureBaseline":
+        data = json.loads(Path(path).read_text())
+        if data.get("version") != BASELINE_VERSION:
+            raise ValueError(f"Unsupported baseline version {data.get('version')}")
+        features = data["features"]
+        return cls(
+            list(features),
+            [f["edges"] for f in features.values()],
+            [f["proportions"] for f in features.values()],
+            data["rows"],
+        )
+
+
+class HistogramBinner:
+    """Vectorized binning of feature rows against per-feature edges"""
+
+    def __init__(self, edges: list):
+        width = max((len(e) for e in edges), default=0)
+        # Pad with +inf so every feature bins with one comparison matrix
+        self.edges = np.full((len(edges), width), np.inf)
+        for i, e in enumerate(edges):
+            self.edges[i, :len(e)] = e
+        self.n_bins = width + 1
+        self.size = len(edges) * self.n_bins
+        self._offsets = np.arange(len(edges)) * self.n_bins
+
+    def flat_indices(self, X: np.ndarray) -> np.ndarray:
+        """Index of every value's bin in a flattened (features, n_bins) histogram"""
+        return (self.edges[None, :, :] < X[:, :, None]).sum(axis=2) + self._offsets
+
+    def counts(self, X: np.ndarray) -> np.ndarray:
+        """Histogram per feature, shape (features, n_bins)"""
+        X = np.asarray(X, dtype=float).reshape(-1, self.edges.shape[0])
+        counts = np.bincount(self.flat_indices(X).ravel(), minlength=self.size)
+        return counts.reshape(-1, self.n_bins).astype(float)
+
+
+class DriftMonitor:
+    """
+    Constant-memory histograms of served features compared to a baseline
+
+    Counts are halved whenever window observations accumulate, so the
+    report tracks roughly the most recent window of traffic.
+    """
+
+    def __init__(self, baseline: FeatureBaseline, window: int = 10000, min_observations: int = 100):
+        self.baseline = baseline
+        self.window = window
+        self.min_observations = min_observations
+        self.binner = HistogramBinner(baseline.edges)
+        self.counts = np.zeros((len(baseline.edges), self.binner.n_bins))
+        self._flat_counts = self.counts.reshape(-1)
+        self.weight = 0.0
+        self.observed = 0
+        self._lock = threading.Lock()
+
+    def observe(self, X: np.ndarray):
+        """Add served feature rows (same column order as the baseline)"""
+        X = np.asarray(X, dtype=float).reshape(-1, len(self.baseline.edges))
+        indices = self.binner.flat_indices(X)
+        with self._lock:
+            if len(X) == 1:
+                # One row touches each bin at most once, so fancy indexing is safe
+                self._flat_counts[indices[0]] += 1
+            else:
+                self._flat_counts += np.bincount(indices.ravel(), minlength=self.binner.size)
+            self.weight += len(X)
+            self.observed += len(X)
+            if self.weight >= self.window:
+                self.counts *= 0.5
+                self.weight *= 0.5
+
+    def psi(self) -> dict:
+        """PSI per feature (None until min_observations have been seen)"""
+        if self.observed < self.min_observations:
+            return {name: None for name in self.baseline.feature_names}
+        with self._lock:
+            counts, weight = self.counts.copy(), self.weight
+        scores = {}
+        for i, (name, expected) in enumerate(zip(self.baseline.feature_names, self.baseline.proportions)):
+            actual = counts[i, :len(expected)] / weight
+            expected = np.clip(expected, _EPSILON, None)
+            actual = np.clip(actual, _EPSILON, None)
+            scores[name] = round(float(np.sum((actual - expected) * np.log(actual / expected))), 4)
+        return scores
+
+    def report(self) -> dict:
+        scores = self.psi()
+        return {
+            "observations": self.observed,
+            "window": self.window,
+            "baseline_rows": self.baseline.rows,
+            "max_psi": max((s for s in scores.values() if s is not None), default=None),
+            "features": {
+                name: {"psi": score, "status": drift_status(score)}
+                for name, score in scores.items()
+            },
+        }
+
+
+def drift_status(score: float) -> str:
+    if score is None:
+        return "insufficient_data"
+    if score >= PSI_SIGNIFICANT:
+        return "significant"
+    if score >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
@@ -0,0 +1,144 @@
+"""
+Model-derived explanations
+Per-feature contributions from the tree ensemble's decision paths, computed
+for whole batches at once and cached by feature vector
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ml_model.compact import LEAF, CompactForest, compact_forest
+
+
+class BoostedTreePaths:
+    """
+    Tree-path decomposition for a fitted HistGradientBoostingClassifier
+
+    Boosted trees add up in log-odds, so contributions are decomposed there
+    (internal nodes take the sample-weighted mean of their leaves) and then
+    scaled so bias + contributions equals the predicted phishing probability.
+    """
+
+    def __init__(self, estimator):
+        feature, threshold, missing_left, left, right, value, offsets = [], [], [], [], [], [], []
+        max_depth = n_nodes = 0
+        for (predictor,) in estimator._predictors:
+            nodes = predictor.nodes
+            offsets.append(n_nodes)
+            n_nodes += len(nodes)
+            max_depth = max(max_depth, int(nodes["depth"].max()))
+            # Children always follow their parent, so a reverse pass fills internal values
+            tree_value = nodes["value"].astype(np.float64)
+            for i in range(len(nodes) - 1, -1, -1):
+                if not nodes["is_leaf"][i]:
+                    l, r = nodes["left"][i], nodes["right"][i]
+                    tree_value[i] = (
+                        tree_value[l] * nodes["count"][l] + tree_value[r] * nodes["count"][r]
+                    ) / max(nodes["count"][l] + nodes["count"][r], 1)
+            feature.append(np.where(nodes["is_leaf"], LEAF, nodes["feature_idx"]))
+            threshold.append(nodes["num_threshold"])
+            missing_left.append(nodes["missing_go_to_left"].astype(bool))
+            left.append(nodes["left"])
+            right.append(nodes["right"])
+            value.append(tree_value)
+        self.feature = np.concatenate(feature).astype(np.int64)
+        self.threshold = np.concatenate(threshold)
+        self.missing_left = np.concatenate(missing_left)
+        self.left = np.concatenate(left).astype(np.int64)
+        self.right = np.concatenate(right).astype(np.int64)
+        self.value = np.concatenate(value)
+        self.tree_offset = np.array(offsets, dtype=np.int64)
+        self.max_depth = max_depth
+        self.n_features = estimator.n_features_in_
+        self.baseline = float(np.ravel(estimator._baseline_prediction)[0])
+
+    def contributions(self, X: np.ndarray) -> tuple:
+        """(bias, contributions) in phishing probability, like CompactForest.contributions"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        offsets = self.tree_offset[np.newaxis, :]
+        node = np.repeat(offsets, len(X), axis=0)
+        raw = np.zeros((len(X), self.n_features), dtype=np.float64)
+        rows = np.repeat(np.arange(len(X))[:, np.newaxis], len(self.tree_offset), axis=1)
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            internal = feature != LEAF
+            if not internal.any():
+                break
+            split_feature = np.where(internal, feature, 0)
+            values = np.take_along_axis(X, split_feature, axis=1)
+            go_left = np.where(np.isnan(values), self.missing_left[node], values <= self.threshold[node])
+            child = np.where(go_left, self.left[node], self.right[node]) + offsets
+            child = np.where(internal, child, node)
+            delta = self.value[child] - self.value[node]
+            np.add.at(raw, (rows[internal], split_feature[internal]), delta[internal])
+            node = child
+
+        bias_raw = self.baseline + self.value[self.tree_offset].sum()
+        total_raw = raw.sum(axis=1)
+        bias = _sigmoid(bias_raw)
+        # Share each row's probability change out in proportion to its log-odds terms
+        scale = np.divide(
+            _sigmoid(bias_raw + total_raw) - bias, total_raw,
+            out=np.zeros_like(total_raw), where=np.abs(total_raw) > 1e-12,
+        )
+        return float(bias), raw * scale[:, np.newaxis]
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class TreeExplainer:
+    """Batched, cached tree-path contributions for a tree ensemble"""
+
+    def __init__(self, forest, feature_names: list, cache_size: int = 10000):
+        self.forest = forest
+        self.feature_names = list(feature_names)
+        self.cache_size = cache_size
+        self.bias = float(forest.contributions(np.zeros(forest.n_features))[0])
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_backend(cls, backend, feature_names: list, cache_size: int = 10000):
+        """Build an explainer for tree backends; returns None for unsupported models"""
+        if isinstance(backend.estimator, CompactForest):
+            forest = backend.estimator
+        elif backend.name == "random_forest":
+            forest = compact_forest(backend.estimator, scaler=getattr(backend, "scaler", None))
+        elif backend.name == "hist_gradient_boosting":
+            forest = BoostedTreePaths(backend.estimator)
+        else:
+            return None
+        return cls(forest, feature_names, cache_size)
+
+    def explain(self, X: np.ndarray) -> list:
+        """Contribution dicts ({feature: phishing-probability delta}) for each row"""
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        keys = [row.tobytes() for row in X]
+        results = [None] * len(X)
+        misses = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    misses.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    results[i] = cached
+
+        if misses:
+            _, contributions = self.forest.contributions(X[misses])
+            with self._lock:
+                for i, row in zip(misses, contributions):
+                    results[i] = dict(zip(self.feature_names, row.tolist()))
+                    self._cache[keys[i]] = results[i]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
@@ -0,0 +1,53 @@
+"""
+URL feature definitions shared by the API and the training pipeline
+Keeping extraction in one place guarantees models are trained on exactly the
+features they are served with
+"""
+
+import re
+from urllib.parse import urlparse
+
+import numpy as np
+
+from ml_model.lookalike import check_lookalike
+
+# Model input order; persisted to features.json next to every trained model
+FEATURE_NAMES = [
+    'has_ssl', 'subdomain_count', 'has_hyphen', 'domain_length',
+    'is_ip', 'has_numbers', 'path_length', 'has_query',
+    'special_chars_in_path', 'has_redirects', 'redirect_count',
+    'brand_similarity'
+]
+
+# Features that need a network probe rather than the URL string alone
+PROBE_FEATURES = ('has_ssl', 'has_redirects', 'redirect_count')
+
+IP_PATTERN = re.compile(r'^\d+\.\d+\.\d+\.\d+')
+PATH_SPECIAL_CHARS = frozenset('@!$&\'()*+,;=:')
+
+
+def extract_lexical_features(url: str) -> dict:
+    """Extract domain-based features (including brand lookalike checks) from the URL string"""
+    parsed = urlparse(url)
+    domain = parsed.netloc.lower()
+
+    return {
+        **check_lookalike(parsed.hostname or domain),
+        "domain": domain,
+        "subdomain_count": domain.count('.') - 1,
+        "has_hyphen": '-' in domain,
+        "has_numbers": any(c.isdigit() for c in domain),
+        "domain_length": len(domain),
+        "is_ip": bool(IP_PATTERN.match(domain)),
+        "path_length": len(parsed.path),
+        "has_query": bool(parsed.query),
+        "special_chars_in_path": sum(1 for c in parsed.path if c in PATH_SPECIAL_CHARS)
+    }
+
+
+def feature_vector(features: dict, feature_names: list = None) -> np.ndarray:
+    """Convert a feature dict into the model's input vector"""
+    return np.array(
+        [float(features.get(name) or 0) for name in (feature_names or FEATURE_NAMES)],
+        dtype=float,
+    )
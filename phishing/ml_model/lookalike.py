@@ -0,0 +1,276 @@
+"""
+Typosquat and brand-lookalike detection
+Compares the labels of a hostname against a list of protected brand domains
+using homoglyph/punycode normalization and a trigram inverted index
+"""
+
+import logging
+import os
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BRANDS_PATH = Path(__file__).parent / "brands.txt"
+
+# Public suffixes with two labels; anything else is treated as a single-label TLD.
+# Shared hosting domains are included so each user's site is its own registrable domain.
+MULTI_LABEL_SUFFIXES = frozenset({
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "co.jp", "ne.jp", "or.jp",
+    "com.au", "net.au", "org.au", "co.nz", "co.za", "co.in", "co.kr", "com.br",
+    "com.cn", "com.mx", "com.tr", "com.sg", "com.hk", "com.tw", "com.ar", "co.id",
+    "github.io", "gitlab.io", "herokuapp.com", "blogspot.com", "azurewebsites.net",
+    "netlify.app", "vercel.app", "pages.dev", "web.app", "firebaseapp.com",
+})
+
+# Brand-list flag for names that are also everyday words (apple, live, office, ...)
+WORD_FLAG = "word"
+
+# Characters commonly substituted for Latin letters in lookalike domains
+HOMOGLYPHS = str.maketrans({
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "к": "k", "м": "m", "н": "h", "о": "o", "р": "p",
+    "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ј": "j", "ѕ": "s", "ԁ": "d",
+    "ӏ": "l", "ԛ": "q", "ԝ": "w",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p",
+    "τ": "t", "υ": "u", "χ": "x",
+    # Digits and symbols
+    "0": "o", "1": "l", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "9": "g",
+    "!": "i", "|": "l", "$": "s", "@": "a",
+})
+
+MULTI_CHAR_GLYPHS = (("rn", "m"), ("vv", "w"), ("cl", "d"))
+
+NGRAM = 3
+
+
+def decode_label(label: str) -> str:
+    """Decode a punycode (xn--) label to Unicode"""
+    if label.startswith("xn--"):
+        try:
+            return label[4:].encode("ascii").decode("punycode")
+        except (UnicodeError, ValueError):
+            return label
+    return label
+
+
+def skeleton(text: str) -> str:
+    """Map a label to its visual skeleton so homoglyph variants compare equal"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = text.translate(HOMOGLYPHS)
+    for glyphs, letter in MULTI_CHAR_GLYPHS:
+        text = text.replace(glyphs, letter)
+    return "".join(c for c in text if c.isalnum())
+
+
+def split_host(host: str) -> tuple:
+    """Split a hostname into (labels before the registrable label, registrable label, suffix)"""
+    host = host.lower().split(":")[0].rstrip(".")
+    labels = [decode_label(label) for label in host.split(".") if label]
+    if len(labels) < 2:
+        return [], labels[0] if labels else "", ""
+    suffix_len = 2 if len(labels) > 2 and ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 1
+    suffix = ".".join(labels[-suffix_len:])
+    return labels[:-suffix_len - 1], labels[-suffix_len - 1], suffix
+
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _ngrams(text: str) -> set:
+    padded = f"^{text}$"
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+class BrandIndex:
+    """
+    Approximate-match index over protected brand names
+
+    Brand skeletons are indexed by padded trigrams. A query counts shared
+    trigrams over the posting lists it hits, keeps brands that pass the
+    q-gram bound for the allowed edit distance, and only verifies those few
+    candidates with a bounded edit distance.
+
+    Each entry is a brand's primary domain, optionally followed by other
+    domains it owns and the "word" flag. Only the primary label is matched;
+    every listed domain is exempt. Word brands match only as the whole
+    registrable label, never fuzzily or inside subdomains and hyphenated
+    names, where the everyday word is far more common than the brand.
+    """
+
+    def __init__(self, brand_domains, max_distance: int = 2, min_similarity: float = 0.75,
+                 min_length: int = 4):
+        self.max_distance = max_distance
+        self.min_similarity = min_similarity
+        self.min_length = min_length
+
+        # Registrable domain -> name of the brand that owns it
+        self.own_domains = {}
+        names, keys, words = [], [], []
+        exact = {}
+        for entry in brand_domains:
+            entry = entry.split("#")[0].lower().split()
+            domains = [d for d in entry if d != WORD_FLAG]
+            if not domains:
+                continue
+            brand = split_host(domains[0])[1]
+            for domain in domains:
+                _, label, suffix = split_host(domain)
+                self.own_domains[f"{label}.{suffix}" if suffix else label] = brand
+            label = brand
+            key = skeleton(label)
+            if len(key) < 3 or key in exact:
+                continue
+            exact[key] = len(names)
+            names.append(label)
+            keys.append(key)
+            words.append(WORD_FLAG in entry)
+
+        self.names = names
+        self.keys = keys
+        self._exact = exact
+        self._words = np.array(words, dtype=bool)
+        self._lengths = np.array([len(k) for k in keys], dtype=np.int32)
+        self._gram_counts = np.array([len(_ngrams(k)) for k in keys], dtype=np.int32)
+        postings = {}
+        for brand_id, key in enumerate(keys):
+            for gram in _ngrams(key):
+                postings.setdefault(gram, []).append(brand_id)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_file(cls, path, **kwargs) -> "BrandIndex":
+        """Load one brand entry per line ('#' starts a comment)"""
+        with open(path, encoding="utf-8") as f:
+            return cls(f, **kwargs)
+
+    def best_match(self, token: str, whole_label: bool = True) -> tuple:
+        """
+        Closest brand for one label or label fragment: (brand, similarity)
+        whole_label is False for subdomains and hyphen-separated parts
+        """
+        key = skeleton(token)
+        if len(key) < 3:
+            return None, 0.0
+        brand_id = self._exact.get(key)
+        if brand_id is not None and (whole_label or not self._words[brand_id]):
+            return self.names[brand_id], 1.0
+        if len(key) < self.min_length or not self.names:
+            return None, 0.0
+
+        query_grams = _ngrams(key)
+        grams = [self._postings[g] for g in query_grams if g in self._postings]
+        if not grams:
+            return None, 0.0
+        # Work only on brands that share at least one gram with the query
+        brand_ids, shared = np.unique(np.concatenate(grams), return_counts=True)
+
+        # Largest distance that can still reach min_similarity for each brand
+        longest = np.maximum(self._lengths[brand_ids], len(key))
+        allowed = np.minimum(
+            self.max_distance, np.floor((1.0 - self.min_similarity) * longest + 1e-9)
+        ).astype(np.int32)
+
+        # q-gram lemma: each edit destroys at most NGRAM grams of either string
+        required = np.maximum(self._gram_counts[brand_ids], len(query_grams)) - NGRAM * allowed
+        keep = (
+            (allowed > 0)
+            & ~self._words[brand_ids]
+            & (shared >= np.maximum(required, 1))
+            & (np.abs(self._lengths[brand_ids] - len(key)) <= allowed)
+        )
+        order = np.argsort(-shared[keep], kind="stable")
+
+        best, best_similarity = None, 0.0
+        for brand_id, limit in zip(brand_ids[keep][order], allowed[keep][order]):
+            brand_key = self.keys[brand_id]
+            distance = bounded_distance(key, brand_key, int(limit))
+            if distance > limit:
+                continue
+            similarity = 1.0 - distance / max(len(key), len(brand_key))
+            if similarity > best_similarity:
+                best, best_similarity = self.names[brand_id], similarity
+        if best_similarity < self.min_similarity:
+            return None, 0.0
+        return best, best_similarity
+
+    def check_host(self, host: str) -> dict:
+        """Lookalike features for a hostname"""
+        no_match = {"brand_similarity": 0.0, "lookalike_brand": None}
+        if host.split(":")[0].replace(".", "").isdigit():
+            return no_match
+        subdomains, label, suffix = split_host(host)
+        registrable = f"{label}.{suffix}" if suffix else label
+        if not label or registrable in self.own_domains:
+            return no_match
+
+        # A brand's own domain spelled out in the subdomains (live.com.verify.net)
+        for i in range(len(subdomains) - 1):
+            for end in range(i + 2, min(i + 3, len(subdomains)) + 1):
+                brand = self.own_domains.get(".".join(subdomains[i:end]))
+                if brand is not None:
+                    return {"brand_similarity": 1.0, "lookalike_brand": brand}
+
+        tokens = [label, *label.split("-")]
+        for sub in subdomains:
+            tokens += [sub, *sub.split("-")]
+
+        best, best_similarity = None, 0.0
+        for position, token in enumerate(dict.fromkeys(tokens)):
+            brand, similarity = self.best_match(token, whole_label=position == 0)
+            if similarity > best_similarity:
+                best, best_similarity = brand, similarity
+                if similarity == 1.0:
+                    break
+        return {"brand_similarity": round(best_similarity, 4), "lookalike_brand": best}
+
+
+_default_index = None
+
+
+def brands_path() -> Path:
+    """Brand list configured by PROTECTED_BRANDS_PATH"""
+    return Path(os.getenv("PROTECTED_BRANDS_PATH") or DEFAULT_BRANDS_PATH)
+
+
+def get_brand_index() -> BrandIndex:
+    """Process-wide index of the brands in PROTECTED_BRANDS_PATH"""
+    global _default_index
+    if _default_index is None:
+        path = brands_path()
+        try:
+            _default_index = BrandIndex.from_file(path)
+            logger.info(f"Loaded {len(_default_index)} protected brands from {path}")
+        except OSError as e:
+            logger.warning(f"Lookalike detection disabled, cannot read {path}: {e}")
+            _default_index = BrandIndex([])
+    return _default_index
+
+
+def check_lookalike(host: str) -> dict:
+    """Lookalike features for a hostname against the configured brand list"""
+    return get_brand_index().check_host(host)
@@ -0,0 +1,187 @@
+"""
+Shadow evaluation of a candidate model on live traffic
+A sampled fraction of served predictions is queued and re-scored by the
+candidate on a background thread, recording how often it disagrees with the
+served verdict and how its inference latency compares
+"""
+
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from ml_model.backends import CompactForestBackend, load_pickled_backend
+from ml_model.features import feature_vector
+
+logger = logging.getLogger(__name__)
+
+
+def load_candidate(path) -> tuple:
+    """
+    (backend, feature_names) for a candidate model file (.pkl or compact .npz)
+    Feature names come from a features.json beside it, else the served model's;
+    legacy pickles pick up a scaler.pkl beside them, as the detector does
+    """
+    path = Path(path)
+    if path.suffix == ".npz":
+        backend = CompactForestBackend.load(path)
+    else:
+        backend = load_pickled_backend(path, path.with_name("scaler.pkl"))
+    features_path = path.with_name("features.json")
+    feature_names = json.loads(features_path.read_text()) if features_path.exists() else None
+    return backend, feature_names
+
+
+def _percentiles(values) -> dict:
+    if not values:
+        return {"p50": None, "p95": None}
+    p50, p95 = np.percentile(list(values), [50, 95])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2)}
+
+
+class ShadowEvaluator:
+    """
+    Background comparison of a candidate model against the served one
+
+    submit() is the only call on the request path: it samples rows and does
+    a non-blocking put, dropping samples when the queue is full. The worker
+    thread loads the candidate lazily, scores queued rows in batches with
+    both models and keeps running counts plus bounded latency windows.
+    """
+
+    def __init__(self, detector, loader, sample_rate: float = 0.1, max_queue: int = 1000,
+                 batch_size: int = 64, latency_window: int = 1000, name: str = None):
+        self.detector = detector
+        self.loader = loader
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.name = name
+
+        self.candidate = None
+        self.candidate_features = None
+        self.error = None
+        self.counts = {
+            "sampled": 0, "dropped": 0, "scored": 0, "disagreements": 0,
+            "safe_to_phishing": 0, "phishing_to_safe": 0,
+            "served_phishing": 0, "candidate_phishing": 0,
+        }
+        self.probability_delta = 0.0
+        self.latency_us = {
+            "primary": deque(maxlen=latency_window),
+            "candidate": deque(maxlen=latency_window),
+        }
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+
+    def submit(self, features_list: list, predictions: list):
+        """Queue a sample of served (features, prediction) pairs; never blocks"""
+        for features, (is_phishing, confidence, _) in zip(features_list, predictions):
+            if random.random() >= self.sample_rate:
+                continue
+            self.counts["sampled"] += 1
+            probability = confidence if is_phishing else 1.0 - confidence
+            try:
+                self._queue.put_nowait((features, is_phishing, probability))
+            except queue.Full:
+                self.counts["dropped"] += 1
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="shadow-evaluator", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        try:
+            self.candidate, self.candidate_features = self.loader()
+            logger.info(f"Shadow evaluation of {self.name or type(self.candidate).__name__} started")
+        except Exception as e:
+            self.error = f"Cannot load candidate model: {e}"
+            logger.error(self.error)
+            return
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self.evaluate(batch)
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"Shadow evaluation failed: {e}")
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def evaluate(self, batch: list):
+        """Score one batch with both models and update the comparison"""
+        primary, primary_features = self.detector.backend, self.detector.feature_names
+        candidate_features = self.candidate_features or primary_features
+        features_list = [features for features, _, _ in batch]
+
+        X_primary = np.vstack([feature_vector(f, primary_features) for f in features_list])
+        X_candidate = np.vstack([feature_vector(f, candidate_features) for f in features_list])
+
+        start = time.perf_counter()
+        primary.predict_proba(X_primary)
+        primary_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        candidate_probabilities = self.candidate.predict_proba(X_candidate)[:, 1]
+        candidate_elapsed = time.perf_counter() - start
+        self.latency_us["primary"].append(primary_elapsed / len(batch) * 1e6)
+        self.latency_us["candidate"].append(candidate_elapsed / len(batch) * 1e6)
+
+        for (_, served_phishing, served_probability), probability in zip(batch, candidate_probabilities):
+            candidate_phishing = bool(probability >= 0.5)
+            self.counts["scored"] += 1
+            self.counts["served_phishing"] += served_phishing
+            self.counts["candidate_phishing"] += candidate_phishing
+            self.probability_delta += abs(float(probability) - served_probability)
+            if candidate_phishing != served_phishing:
+                self.counts["disagreements"] += 1
+                self.counts["phishing_to_safe" if served_phishing else "safe_to_phishing"] += 1
+
+    def stats(self) -> dict:
+        scored = self.counts["scored"]
+        return {
+            "candidate": self.name,
+            "candidate_loaded": self.candidate is not None,
+            "error": self.error,
+            "sample_rate": self.sample_rate,
+            "queued": self._queue.qsize(),
+            **self.counts,
+            "disagreement_rate": round(self.counts["disagreements"] / scored, 4) if scored else None,
+            "served_phishing_rate": round(self.counts["served_phishing"] / scored, 4) if scored else None,
+            "candidate_phishing_rate": round(self.counts["candidate_phishing"] / scored, 4) if scored else None,
+            "mean_probability_delta": round(self.probability_delta / scored, 4) if scored else None,
+            "latency_us_per_row": {
+                model: _percentiles(values) for model, values in self.latency_us.items()
+            },
+        }
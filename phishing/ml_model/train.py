@@ -0,0 +1,284 @@
+"""
+Training pipeline for large labeled URL corpora
+Streams labeled URL files in chunks, extracts features across processes,
+caches feature columns on disk and trains a backend with holdout metrics
+
+Input files are CSV with a header containing at least ``url`` and ``label``
+columns. Probe features (has_ssl, has_redirects, redirect_count) are read
+from matching columns when present; otherwise has_ssl falls back to the
+URL scheme and redirects default to none.
+
+Usage:
+    python -m ml_model.train feeds/*.csv [--backend random_forest]
+        [--output-dir ml_model] [--cache-dir .feature_cache] [--workers 8]
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml_model.backends import create_backend
+from ml_model.detector import PhishingDetector
+from ml_model.features import FEATURE_NAMES, PROBE_FEATURES, extract_lexical_features, feature_vector
+from ml_model.lookalike import brands_path
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction logic changes so stale caches are not reused
+FEATURE_CACHE_VERSION = 2
+
+COLUMN_DTYPE = np.float32
+LABEL_DTYPE = np.int8
+
+POSITIVE_LABELS = {"1", "phishing", "malicious", "bad", "true", "yes"}
+NEGATIVE_LABELS = {"0", "legitimate", "benign", "good", "false", "no"}
+
+
+def parse_label(value: str) -> int:
+    """Map common label spellings to 1 (phishing) or 0 (legitimate)"""
+    normalized = value.strip().lower()
+    if normalized in POSITIVE_LABELS:
+        return 1
+    if normalized in NEGATIVE_LABELS:
+        return 0
+    raise ValueError(f"Unrecognized label: {value!r}")
+
+
+def iter_chunks(path: Path, chunk_size: int):
+    """Yield lists of CSV rows without reading the whole file"""
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or not {"url", "label"} <= set(reader.fieldnames):
+            raise ValueError(f"{path} must have 'url' and 'label' columns")
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def extract_chunk(rows: list) -> tuple:
+    """Turn CSV rows into a feature matrix and label vector (runs in a worker)"""
+    X = np.zeros((len(rows), len(FEATURE_NAMES)), dtype=COLUMN_DTYPE)
+    y = np.zeros(len(rows), dtype=LABEL_DTYPE)
+    keep = np.ones(len(rows), dtype=bool)
+    for i, row in enumerate(rows):
+        try:
+            url = row["url"].strip()
+            if not url.startswith(("http://", "https://")):
+                url = "https://" + url
+            features = extract_lexical_features(url)
+            features["has_ssl"] = url.startswith("https://")
+            for name in PROBE_FEATURES:
+                if row.get(name) not in (None, ""):
+                    features[name] = float(row[name])
+            features["has_redirects"] = bool(features.get("has_redirects") or features.get("redirect_count"))
+            X[i] = feature_vector(features)
+            y[i] = parse_label(row["label"])
+        except (ValueError, KeyError, AttributeError):
+            keep[i] = False
+    return X[keep], y[keep]
+
+
+# ============================================================================
+# Columnar feature cache
+# ============================================================================
+
+def brand_list_digest() -> str:
+    """Hash of the protected brand list the lookalike features are scored against"""
+    try:
+        return hashlib.sha256(brands_path().read_bytes()).hexdigest()
+    except OSError:
+        return ""
+
+
+def cache_key(path: Path) -> str:
+    """Identify a source file version together with the feature definition"""
+    stat = path.stat()
+    fingerprint = json.dumps([
+        str(path.resolve()), stat.st_size, stat.st_mtime_ns,
+        FEATURE_CACHE_VERSION, FEATURE_NAMES, brand_list_digest(),
+    ])
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def load_cached(cache_dir: Path) -> tuple:
+    """Memory-map cached feature columns; returns None when absent"""
+    meta_path = cache_dir / "meta.json"
+    if not meta_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text())
+    rows = meta["rows"]
+    columns = [
+        np.memmap(cache_dir / f"{name}.bin", dtype=COLUMN_DTYPE, mode="r", shape=(rows,))
+        if rows else np.zeros(0, dtype=COLUMN_DTYPE)
+        for name in meta["features"]
+    ]
+    labels = (
+        np.memmap(cache_dir / "label.bin", dtype=LABEL_DTYPE, mode="r", shape=(rows,))
+        if rows else np.zeros(0, dtype=LABEL_DTYPE)
+    )
+    return columns, labels
+
+
+def extract_file(path: Path, cache_root: Path, chunk_size: int, workers: int) -> tuple:
+    """Extract features for one file, reusing or filling its column cache"""
+    cache_dir = cache_root / cache_key(path)
+    cached = load_cached(cache_dir)
+    if cached is not None:
+        logger.info(f"Using cached features for {path}")
+        return cached
+
+    staging = cache_dir.with_name(cache_dir.name + f".{os.getpid()}.partial")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    handles = {name: open(staging / f"{name}.bin", "wb") for name in FEATURE_NAMES}
+    handles["label"] = open(staging / "label.bin", "wb")
+    rows = 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = []
+            chunks = iter_chunks(path, chunk_size)
+            for chunk in chunks:
+                pending.append(pool.submit(extract_chunk, chunk))
+                # Bound in-flight chunks so memory stays flat for huge files
+                if len(pending) >= workers * 2:
+                    rows += _append_columns(handles, pending.pop(0).result())
+            for future in pending:
+                rows += _append_columns(handles, future.result())
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    (staging / "meta.json").write_text(json.dumps({
+        "source": str(path), "rows": rows, "features": FEATURE_NAMES,
+        "version": FEATURE_CACHE_VERSION,
+    }))
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(staging, cache_dir)
+    logger.info(f"Extracted {rows} rows from {path} in {time.perf_counter() - start:.1f}s")
+    return load_cached(cache_dir)
+
+
+def _append_columns(handles: dict, result: tuple) -> int:
+    """Append one chunk's columns to the open column files"""
+    X, y = result
+    for i, name in enumerate(FEATURE_NAMES):
+        np.ascontiguousarray(X[:, i]).tofile(handles[name])
+    y.tofile(handles["label"])
+    return len(y)
+
+
+# ============================================================================
+# Training and evaluation
+# ============================================================================
+
+def load_corpus(paths: list, cache_root: Path, chunk_size: int, workers: int) -> tuple:
+    """Feature matrix and labels for every input file"""
+    columns = [[] for _ in FEATURE_NAMES]
+    labels = []
+    for path in paths:
+        file_columns, file_labels = extract_file(Path(path), cache_root, chunk_size, workers)
+        for i, column in enumerate(file_columns):
+            columns[i].append(column)
+        labels.append(file_labels)
+    X = np.column_stack([np.concatenate(c) for c in columns]).astype(COLUMN_DTYPE)
+    return X, np.concatenate(labels).astype(int)
+
+
+def holdout_metrics(backend, X_test: np.ndarray, y_test: np.ndarray) -> dict:
+    """Classification metrics on the holdout split"""
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+
+    probabilities = backend.predict_proba(X_test)[:, 1]
+    predictions = (probabilities >= 0.5).astype(int)
+    metrics = {
+        "holdout_rows": int(len(y_test)),
+        "accuracy": accuracy_score(y_test, predictions),
+        "precision": precision_score(y_test, predictions, zero_division=0),
+        "recall": recall_score(y_test, predictions, zero_division=0),
+        "f1": f1_score(y_test, predictions, zero_division=0),
+    }
+    if len(set(y_test)) == 2:
+        metrics["roc_auc"] = roc_auc_score(y_test, probabilities)
+    return {k: round(float(v), 4) if isinstance(v, float) else v for k, v in metrics.items()}
+
+
+def train(paths: list, backend_name: str = None, output_dir: Path = None,
+          cache_dir: Path = None, chunk_size: int = 50000, workers: int = None,
+          test_fraction: float = 0.2, seed: int = 42) -> dict:
+    """Run the full pipeline and publish the model into output_dir"""
+    output_dir = Path(output_dir or Path(__file__).parent)
+    cache_dir = Path(cache_dir or output_dir / ".feature_cache")
+    workers = workers or os.cpu_count() or 1
+
+    X, y = load_corpus(paths, cache_dir, chunk_size, workers)
+    if len(set(y)) < 2:
+        raise ValueError("Training data must contain both phishing and legitimate URLs")
+
+    order = np.random.default_rng(seed).permutation(len(X))
+    cut = int(len(X) * (1 - test_fraction))
+    train_idx, test_idx = order[:cut], order[cut:]
+
+    start = time.perf_counter()
+    backend = create_backend(backend_name).fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+
+    metrics = {
+        "backend": backend.name,
+        "train_rows": int(len(train_idx)),
+        "fit_seconds": round(fit_seconds, 2),
+        **(holdout_metrics(backend, X[test_idx], y[test_idx]) if len(test_idx) else {}),
+    }
+
+    detector = PhishingDetector(backend=backend.name, model_dir=output_dir, autoload=False)
+    detector.publish(backend, FEATURE_NAMES)
+    detector.save_feature_baseline(X[train_idx])
+    metrics["model_version"] = detector.model_version
+    (output_dir / "training_metrics.json").write_text(json.dumps(metrics, indent=2))
+    logger.info(f"Training complete: {metrics}")
+    return metrics
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Train the phishing detector on labeled URL files")
+    parser.add_argument("paths", nargs="+", help="CSV files with url and label columns")
+    parser.add_argument("--backend", default=os.getenv("MODEL_BACKEND"))
+    parser.add_argument("--output-dir", default=str(Path(__file__).parent))
+    parser.add_argument("--cache-dir", help="feature cache directory (default: <output-dir>/.feature_cache)")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    metrics = train(
+        args.paths,
+        backend_name=args.backend,
+        output_dir=args.output_dir,
+        cache_dir=args.cache_dir,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        test_fraction=args.test_fraction,
+    )
+    print(json.dumps(metrics, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Incremental model updates from analyst feedback
+A background thread folds newly labeled examples into the live model by
+adding estimators fitted on the new data only, then hot-publishes the result
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ml_model.features import feature_vector
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalUpdater:
+    """
+    Periodically applies pending feedback to a PhishingDetector
+
+    Every worker runs one updater. The worker holding the update lock trains
+    and publishes; the others reload the published model when it changes.
+    The leader reloads too before each update, so a model published by
+    another process is extended rather than overwritten.
+    """
+
+    def __init__(self, detector, feedback_store, min_examples: int = 20,
+                 interval: float = 300.0, trees_per_update: int = 10,
+                 max_batch: int = 10000):
+        self.detector = detector
+        self.feedback_store = feedback_store
+        self.min_examples = min_examples
+        self.interval = interval
+        self.trees_per_update = trees_per_update
+        self.max_batch = max_batch
+
+        self.state_path = Path(detector.model_path).with_name("feedback_state.json")
+        self.lock_path = Path(detector.model_path).with_name(".update.lock")
+        self.updates_applied = 0
+        self.last_update_at = None
+        self.last_error = None
+
+        self._lock_file = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the background update loop"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="incremental-updater", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background loop and release the update lock"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                if self._is_leader():
+                    self.run_once()
+                else:
+                    self.detector.reload_if_changed()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Incremental update failed: {e}")
+
+    def _is_leader(self) -> bool:
+        """Take the cross-process update lock if no other worker holds it"""
+        if fcntl is None or self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def pending(self) -> int:
+        """Number of feedback examples not yet applied to the model"""
+        return self.feedback_store.count_feedback_after(self._watermark())
+
+    def run_once(self) -> bool:
+        """Apply pending feedback if enough has accumulated; returns True on publish"""
+        # Build on whatever was published last (e.g. by ml_model.train), never overwrite it
+        self.detector.reload_if_changed()
+        if not self.supported:
+            self.last_error = f"Backend '{self.detector.backend.name}' does not support incremental updates"
+            return False
+        watermark = self._watermark()
+        examples = self.feedback_store.feedback_after(watermark, self.max_batch)
+        if len(examples) < self.min_examples:
+            return False
+
+        examples += self._replay_examples(examples)
+        if len({e["is_phishing"] for e in examples}) < 2:
+            logger.info("Feedback has a single label and no replay examples yet; waiting")
+            return False
+
+        feature_names = self.detector.feature_names
+        X = np.vstack([feature_vector(e["features"], feature_names) for e in examples])
+        y = np.array([int(e["is_phishing"]) for e in examples])
+
+        start = time.perf_counter()
+        updated = self.detector.backend.partial_update(X, y, n_estimators=self.trees_per_update)
+        self.detector.publish(updated, feature_names)
+        self._save_watermark(max(e["id"] for e in examples))
+
+        self.updates_applied += 1
+        self.last_update_at = time.time()
+        self.last_error = None
+        logger.info(
+            f"Applied {len(examples)} feedback examples in {time.perf_counter() - start:.2f}s; "
+            f"model version {self.detector.model_version}"
+        )
+        return True
+
+    @property
+    def supported(self) -> bool:
+        """Whether the loaded backend can be extended with feedback"""
+        backend = self.detector.backend
+        return backend is not None and backend.supports_partial_update
+
+    def _replay_examples(self, examples: list) -> list:
+        """
+        Older feedback with the missing label, so single-label batches
+        (e.g. only false-positive corrections) still train two-class trees
+        """
+        labels = {e["is_phishing"] for e in examples}
+        if len(labels) == 2:
+            return []
+        missing = not labels.pop()
+        newest = min(e["id"] for e in examples) - 1
+        return self.feedback_store.recent_feedback(missing, newest, len(examples))
+
+    def _watermark(self) -> int:
+        try:
+            return json.loads(self.state_path.read_text())["last_feedback_id"]
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def _save_watermark(self, feedback_id: int):
+        tmp_path = self.state_path.with_name(f".{self.state_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"last_feedback_id": feedback_id}))
+        os.replace(tmp_path, self.state_path)
+
+    def stats(self) -> dict:
+        return {
+            "supported": self.supported,
+            "pending_examples": self.pending(),
+            "min_examples": self.min_examples,
+            "updates_applied": self.updates_applied,
+            "last_update_at": self.last_update_at,
+            "last_error": self.last_error,
+            "model_version": self.detector.model_version,
+        }
@@ -0,0 +1,84 @@
+"""
+Tests for probe admission control
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.admission import DEGRADE, PROBE, REJECT, AdmissionController
+
+
+class TestAdmissionDecisions:
+    """Test load-shedding thresholds"""
+    
+    def test_admits_with_free_slots(self):
+        """Test requests probe while capacity remains"""
+        controller = AdmissionController(max_concurrent_probes=2)
+        assert controller.decide() == PROBE
+    
+    def test_degrades_then_rejects(self):
+        """Test expected queue wait drives degrade and reject decisions"""
+        controller = AdmissionController(max_concurrent_probes=2, degrade_wait=1.0, reject_wait=3.0)
+        controller.in_flight = 2
+        controller.probe_seconds = 1.0
+        controller.queued = 2  # (2 + 1) / 2 * 1s = 1.5s expected wait
+        assert controller.decide() == DEGRADE
+        controller.queued = 6  # 3.5s expected wait
+        assert controller.decide() == REJECT
+        assert controller.stats()["degraded"] == 1
+        assert controller.stats()["rejected"] == 1
+    
+    def test_queue_limit_rejects(self):
+        """Test a full queue rejects regardless of probe speed"""
+        controller = AdmissionController(max_concurrent_probes=1, max_queue=3)
+        controller.in_flight = 1
+        controller.probe_seconds = 0.001
+        controller.queued = 3
+        assert controller.decide() == REJECT
+
+
+    def test_admitted_requests_are_reserved(self):
+        """Test PROBE decisions count before their probes start"""
+        controller = AdmissionController(max_concurrent_probes=2, degrade_wait=1.0)
+        controller.probe_seconds = 1.0
+        assert [controller.decide() for _ in range(4)] == [PROBE, PROBE, PROBE, DEGRADE]
+        assert controller.reserved == 3
+    
+    def test_probe_takes_over_reservation(self):
+        """Test a probe started in a task consumes its request's reservation once"""
+        controller = AdmissionController(max_concurrent_probes=2)
+        
+        async def run():
+            assert controller.decide() == PROBE
+            result = await asyncio.ensure_future(controller.run_probe(lambda: "ok"))
+            controller.release()
+            return result
+        
+        assert asyncio.run(run()) == "ok"
+        assert controller.reserved == 0 and controller.queued == 0
+
+
+class TestProbeExecution:
+    """Test bounded probe execution"""
+    
+    def test_concurrency_is_bounded(self):
+        """Test no more than capacity probes run at once and waits are tracked"""
+        controller = AdmissionController(max_concurrent_probes=2)
+        peak = []
+        
+        def probe():
+            peak.append(controller.in_flight)
+            time.sleep(0.05)
+            return "ok"
+        
+        async def run():
+            return await asyncio.gather(*(controller.run_probe(probe) for _ in range(6)))
+        
+        assert asyncio.run(run()) == ["ok"] * 6
+        assert max(peak) == 2
+        assert controller.in_flight == 0
+        assert controller.queue_wait_seconds > 0
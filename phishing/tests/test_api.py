@@ -3,11 +3,16 @@ PhishGuard AI - Comprehensive Test Suite
 Tests for phishing detection model and API endpoints
 """
 
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
+import os
 import sys
 from pathlib import Path
 
+# Keep analysis history in memory during tests
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
 # Add backend to path
 sys.path.insert(0, str(Path(__file__).parent / "backend"))
 
@@ -34,6 +39,26 @@ class TestHealthEndpoints:
         data = response.json()
         assert data["status"] == "healthy"
         assert "timestamp" in data
+    
+    def test_liveness(self):
+        """Test liveness answers without waiting for the model"""
+        response = client.get("/health/live")
+        assert response.status_code == 200
+        assert response.json()["status"] == "alive"
+    
+    def test_readiness_follows_warm_up(self):
+        """Test readiness is 503 until warm-up completes"""
+        from app import startup_state, warm_up
+        startup_state["ready"] = False
+        assert client.get("/health/ready").status_code == 503
+        
+        warm_up()
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert data["startup_seconds"] >= data["import_seconds"] > 0
+        assert data["model_version"]
 
 
 class TestPhishingDetection:
@@ -97,6 +122,32 @@ class TestPhishingDetection:
         assert "risk_factors" in data["explanation"]
         assert "safe_factors" in data["explanation"]
         assert isinstance(data["recommendations"], list)
+    
+    def test_explanation_from_model(self):
+        """Test explanations carry per-feature model contributions"""
+        response = client.post("/api/analyze", json={"url": "http://192.168.1.1/a@b!c"})
+        assert response.status_code == 200
+        contributions = response.json()["explanation"]["contributions"]
+        assert "is_ip" in contributions
+        assert all(isinstance(v, float) for v in contributions.values())
+
+
+class TestResponseEncoding:
+    """Test the fast response encoding path"""
+    
+    def test_recommendations_are_shared(self):
+        """Test recommendation blocks are precomputed rather than rebuilt"""
+        from app import _generate_recommendations
+        first = _generate_recommendations(True, ["No SSL certificate"])
+        assert first is _generate_recommendations(True, ["No SSL certificate", "Hyphenated domain"])
+        assert first[-1] == "Avoid entering sensitive information on this website"
+    
+    def test_analyze_returns_json(self):
+        """Test the fast path still produces the documented JSON schema"""
+        response = client.post("/api/analyze", json={"url": "https://example.com"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert isinstance(response.json()["recommendations"], list)
 
 
 class TestThreatDetection:
@@ -140,6 +191,346 @@ class TestBatchAnalysis:
         data = response.json()
         assert "results" in data
         assert len(data["results"]) == len(urls)
+        assert all("contributions" in r["explanation"] for r in data["results"])
+
+
+class TestAnalysisHistory:
+    """Test analysis history lookups"""
+    
+    ADMIN = {"X-Admin-Token": "secret"}
+    
+    @pytest.fixture(autouse=True)
+    def admin_token(self, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    
+    def test_history_requires_admin(self):
+        """Test history lookups are refused without the admin token"""
+        assert client.get("/api/history", params={"url": "https://example.org/"}).status_code == 403
+        assert client.get("/api/history/domain/example.org").status_code == 403
+    
+    def test_history_records_analysis(self):
+        """Test analyzed URLs are persisted and retrievable"""
+        from app import analysis_store
+        client.post("/api/analyze", json={"url": "https://example.org/login"})
+        analysis_store.flush()
+        
+        response = client.get("/api/history", params={"url": "HTTPS://Example.org:443/login#top"},
+                              headers=self.ADMIN)
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert len(results) >= 1
+        assert results[0]["canonical_url"] == "https://example.org/login"
+        assert "model_version" in results[0]
+    
+    def test_domain_history(self):
+        """Test domain lookups within a time window"""
+        from app import analysis_store
+        client.post("/api/analyze", json={"url": "https://example.org/account"})
+        analysis_store.flush()
+        
+        response = client.get("/api/history/domain/example.org", params={"since": "2000-01-01T00:00:00"},
+                              headers=self.ADMIN)
+        assert response.status_code == 200
+        assert all(r["domain"] == "example.org" for r in response.json()["results"])
+    
+    def test_invalid_since(self):
+        """Test malformed timestamps are rejected"""
+        response = client.get("/api/history/domain/example.org", params={"since": "last week"},
+                              headers=self.ADMIN)
+        assert response.status_code == 400
+
+
+class TestAdmissionControl:
+    """Test load shedding on the analyze endpoint"""
+    
+    def test_overload_degrades_to_lexical(self):
+        """Test requests are scored without probes when the queue is long"""
+        from app import admission
+        probe_seconds = admission.probe_seconds
+        admission.in_flight, admission.queued = admission.capacity, admission.capacity
+        admission.probe_seconds = admission.degrade_wait
+        try:
+            response = client.post("/api/analyze", json={"url": "https://degraded.example.com"})
+        finally:
+            admission.in_flight, admission.queued = 0, 0
+            admission.probe_seconds = probe_seconds
+        assert response.status_code == 200
+        assert response.json()["analysis_mode"] == "lexical"
+    
+    def test_overload_rejects_with_retry_after(self):
+        """Test requests are rejected fast past the reject threshold"""
+        from app import admission
+        admission.in_flight, admission.queued = admission.capacity, admission.max_queue
+        try:
+            response = client.post("/api/analyze", json={"url": "https://rejected.example.com"})
+        finally:
+            admission.in_flight, admission.queued = 0, 0
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(admission.retry_after)
+        assert client.get("/api/admission").json()["rejected"] >= 1
+    
+    def test_cached_batch_is_shed(self, monkeypatch):
+        """Test a batch whose probes start as cache loads is still admission-controlled"""
+        import time
+        import app
+        from app import admission, result_cache
+        
+        assert result_cache is not None
+        def slow_probe(url):
+            time.sleep(0.05)
+            return app.URLAnalyzer.collect_lexical_features(url)
+        monkeypatch.setattr(app.URLAnalyzer, "collect_features", slow_probe)
+        monkeypatch.setattr(admission, "capacity", 2)
+        monkeypatch.setattr(admission, "max_queue", 3)
+        monkeypatch.setattr(admission, "probe_seconds", 1.0)
+        monkeypatch.setattr(admission, "_semaphore", None)
+        before = client.get("/api/admission").json()
+        
+        urls = [f"https://shed-{i}.example.com" for i in range(20)]
+        results = client.post("/api/batch-analyze", json=urls).json()["results"]
+        after = client.get("/api/admission").json()
+        modes = [r["analysis_mode"] for r in results]
+        assert modes.count("full") == after["admitted"] - before["admitted"] == 3
+        assert modes.count("lexical") == 17
+        assert after["reserved"] == 0 and after["queued"] == 0
+
+
+class TestResultCache:
+    """Test probe results are reused across requests"""
+    
+    def test_repeat_analysis_is_served_from_cache(self):
+        """Test a repeated URL skips the probes"""
+        first = client.post("/api/analyze", json={"url": "https://cached.example.com/login"})
+        second = client.post("/api/analyze", json={"url": "https://CACHED.example.com/login"})
+        assert first.json()["analysis_mode"] == "full"
+        assert second.json()["analysis_mode"] == "cached"
+        assert second.json()["confidence"] == first.json()["confidence"]
+        assert client.get("/api/cache").json()["hits"] >= 1
+
+
+class TestScanSocket:
+    """Test the WebSocket scanning channel"""
+    
+    def test_provisional_then_final_verdict(self):
+        """Test probed URLs get a lexical verdict first and the full one later"""
+        with client.websocket_connect("/ws/scan") as ws:
+            ws.send_json({"type": "scan", "id": 1, "url": "https://ws-probe.example.com/login"})
+            provisional = ws.receive_json()
+            final = ws.receive_json()
+        assert provisional["id"] == 1 and provisional["final"] is False
+        assert provisional["analysis_mode"] == "lexical"
+        assert final["id"] == 1 and final["final"] is True
+        assert final["analysis_mode"] == "full"
+    
+    def test_cached_url_answers_immediately(self):
+        """Test a cached URL gets a single final verdict"""
+        client.post("/api/analyze", json={"url": "https://ws-cached.example.com"})
+        with client.websocket_connect("/ws/scan") as ws:
+            ws.send_json({"type": "scan", "id": "a", "url": "https://ws-cached.example.com"})
+            result = ws.receive_json()
+        assert result["final"] is True
+        assert result["analysis_mode"] == "cached"
+    
+    def test_cancelled_scan_sends_no_final(self, monkeypatch):
+        """Test cancelling a pending scan suppresses its final verdict"""
+        from app import result_cache
+        
+        async def slow_probe(url):
+            await asyncio.sleep(30)
+        
+        client.post("/api/analyze", json={"url": "https://ws-after-cancel.example.com"})
+        monkeypatch.setattr(result_cache, "loader", slow_probe)
+        with client.websocket_connect("/ws/scan") as ws:
+            ws.send_json({"type": "scan", "id": "slow", "url": "https://ws-cancel.example.com"})
+            assert ws.receive_json()["final"] is False
+            ws.send_json({"type": "cancel", "id": "slow"})
+            ws.send_json({"type": "scan", "id": "next", "url": "https://ws-after-cancel.example.com"})
+            assert ws.receive_json()["id"] == "next"
+    
+    def test_reused_id_keeps_new_scan_pending(self, monkeypatch):
+        """Test a cancelled scan does not drop a newer scan that reuses its id"""
+        from app import result_cache
+        
+        async def slow_probe(url):
+            await asyncio.sleep(30)
+        
+        monkeypatch.setattr(result_cache, "loader", slow_probe)
+        with client.websocket_connect("/ws/scan") as ws:
+            ws.send_json({"type": "scan", "id": "dup", "url": "https://ws-dup-1.example.com"})
+            assert ws.receive_json()["final"] is False
+            ws.send_json({"type": "cancel", "id": "dup"})
+            ws.send_json({"type": "scan", "id": "dup", "url": "https://ws-dup-2.example.com"})
+            assert ws.receive_json()["final"] is False
+            ws.send_json({"type": "scan", "id": "dup", "url": "https://ws-dup-3.example.com"})
+            assert ws.receive_json()["detail"] == "Scan id already in progress"
+    
+    def test_scan_failure_sends_error(self, monkeypatch):
+        """Test an exception while scoring answers with an error frame"""
+        import app
+        
+        build_responses = app._build_responses
+        def fail_once(*args, **kwargs):
+            monkeypatch.setattr(app, "_build_responses", build_responses)
+            raise RuntimeError("model unavailable")
+        monkeypatch.setattr(app, "_build_responses", fail_once)
+        
+        with client.websocket_connect("/ws/scan") as ws:
+            ws.send_json({"type": "scan", "id": "boom", "url": "https://ws-error.example.com"})
+            assert ws.receive_json() == {
+                "type": "error", "id": "boom", "detail": "Error analyzing URL. Please try again."
+            }
+            ws.send_text("not json")
+            assert ws.receive_json()["type"] == "error"
+    
+    def test_invalid_messages_report_errors(self):
+        """Test malformed messages get an error instead of closing the socket"""
+        with client.websocket_connect("/ws/scan") as ws:
+            ws.send_text("not json")
+            assert ws.receive_json()["type"] == "error"
+            ws.send_json({"type": "unknown", "id": 7})
+            assert ws.receive_json() == {"type": "error", "id": 7, "detail": "Unknown message type"}
+            ws.send_json({"type": "scan", "id": [1], "url": "https://ws-bad-id.example.com"})
+            assert ws.receive_json() == {"type": "error", "id": None, "detail": "Scan id must be a string or integer"}
+            ws.send_json({"type": "cancel", "id": {"a": 1}})
+            assert ws.receive_json()["type"] == "error"
+
+
+class TestProfilingEndpoint:
+    """Test slow-request capture through the admin endpoint"""
+    
+    def test_admin_endpoint_requires_token(self, monkeypatch):
+        """Test the endpoint is hidden without ADMIN_TOKEN and checks the header"""
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+        assert client.get("/api/admin/slow-requests").status_code == 404
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        assert client.get("/api/admin/slow-requests").status_code == 403
+        assert client.get("/api/admin/slow-requests", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    
+    def test_slow_analysis_is_captured(self, monkeypatch):
+        """Test slow analyses are downloadable with their stage timings"""
+        from app import profiler
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        monkeypatch.setattr(profiler, "enabled", True)
+        monkeypatch.setattr(profiler, "slow_threshold", 0.0)
+        
+        client.post("/api/analyze", json={"url": "https://profiled.example.com"})
+        response = client.get("/api/admin/slow-requests", headers={"X-Admin-Token": "secret"})
+        assert response.status_code == 200
+        record = response.json()["records"][0]
+        assert record["endpoint"] == "analyze"
+        assert record["url"] == "https://profiled.example.com"
+        assert {"predict", "explain", "encode"} <= set(record["stages_ms"])
+
+
+class TestDriftEndpoint:
+    """Test the feature-drift report"""
+    
+    @pytest.fixture
+    def baseline_detector(self, tmp_path, monkeypatch):
+        import app
+        from ml_model.detector import PhishingDetector
+        
+        detector = PhishingDetector(backend="random_forest", model_dir=tmp_path)
+        monkeypatch.setattr(app, "detector", detector)
+        return detector
+    
+    def test_drift_report(self, baseline_detector):
+        """Test drift scores are reported when the model has a baseline"""
+        X, _ = baseline_detector._create_training_data()
+        baseline_detector.drift_monitor.observe(X)
+        
+        response = client.get("/api/drift")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["enabled"] is True
+        assert data["model_version"] == baseline_detector.model_version
+        assert data["observations"] == len(X)
+        assert set(data["features"]) == set(baseline_detector.feature_names)
+        assert data["features"]["domain_length"]["status"] == "stable"
+        assert data["max_psi"] < 0.1
+    
+    def test_only_final_verdicts_are_observed(self, baseline_detector):
+        """Test provisional WebSocket verdicts do not feed the drift window"""
+        with client.websocket_connect("/ws/scan") as ws:
+            ws.send_json({"type": "scan", "id": 1, "url": "https://ws-drift.example.com/login"})
+            assert ws.receive_json()["final"] is False
+            assert ws.receive_json()["final"] is True
+        assert client.get("/api/drift").json()["observations"] == 1
+    
+    def test_drift_disabled_without_baseline(self, baseline_detector):
+        """Test models without a saved baseline report drift monitoring off"""
+        baseline_detector.baseline_path.unlink()
+        baseline_detector._load_drift_monitor()
+        
+        data = client.get("/api/drift").json()
+        assert data["enabled"] is False
+
+
+class TestShadowEndpoint:
+    """Test shadow evaluation status"""
+    
+    def test_shadow_disabled_without_candidate(self):
+        """Test the endpoint reports shadow mode off when no candidate is configured"""
+        response = client.get("/api/shadow")
+        assert response.status_code == 200
+        assert response.json() == {"enabled": False}
+
+
+class TestFeedback:
+    """Test analyst feedback submission"""
+    
+    ADMIN = {"X-Admin-Token": "secret"}
+    
+    @pytest.fixture(autouse=True)
+    def admin_token(self, monkeypatch):
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    
+    def test_feedback_requires_admin(self):
+        """Test unauthenticated feedback cannot reach the training data"""
+        response = client.post("/api/feedback", json={"url": "https://example.org", "is_phishing": True})
+        assert response.status_code == 403
+    
+    def test_submit_feedback(self):
+        """Test labeled examples are accepted and counted"""
+        client.post("/api/analyze", json={"url": "https://example.org/promo"})
+        response = client.post("/api/feedback", json={
+            "url": "https://example.org/promo", "is_phishing": False, "note": "false positive"
+        }, headers=self.ADMIN)
+        assert response.status_code == 201
+        data = response.json()
+        assert data["status"] == "accepted"
+        assert data["pending_examples"] >= 1
+    
+    def test_unseen_url_is_probed_with_admission(self, monkeypatch):
+        """Test feedback for a new URL probes it through the admission-controlled path"""
+        import app
+        
+        probed = []
+        def probe(url):
+            probed.append(app.admission.in_flight)
+            return app.URLAnalyzer.collect_lexical_features(url)
+        monkeypatch.setattr(app.URLAnalyzer, "collect_features", probe)
+        response = client.post("/api/feedback", json={
+            "url": "https://never-analyzed.example.org", "is_phishing": True
+        }, headers=self.ADMIN)
+        assert response.status_code == 201
+        assert probed == [1]
+    
+    def test_backend_without_updates_rejects_feedback(self, monkeypatch):
+        """Test feedback is refused when the served backend cannot be updated"""
+        import app
+        from ml_model.backends import create_backend
+        
+        monkeypatch.setattr(app.get_detector(), "backend", create_backend("compact_forest"))
+        response = client.post("/api/feedback", json={
+            "url": "https://example.org/promo", "is_phishing": False
+        }, headers=self.ADMIN)
+        assert response.status_code == 409
+    
+    def test_feedback_requires_label(self):
+        """Test feedback without a label is rejected"""
+        response = client.post("/api/feedback", json={"url": "https://example.org"}, headers=self.ADMIN)
+        assert response.status_code == 422
 
 
 class TestErrorHandling:
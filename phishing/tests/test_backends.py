@@ -0,0 +1,97 @@
+"""
+Tests for pluggable model backends
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml_model.backends import BACKENDS, CompactForestBackend, RandomForestBackend, create_backend
+from ml_model.detector import PhishingDetector
+
+
+class TestBackends:
+    """Test backend registry and training"""
+    
+    @pytest.mark.parametrize("name", sorted(BACKENDS))
+    def test_backend_fits_and_predicts(self, name):
+        """Test every backend returns two-class probabilities"""
+        X, y = PhishingDetector._create_training_data()
+        backend = create_backend(name).fit(X, y)
+        proba = backend.predict_proba(X[:5])
+        assert proba.shape == (5, 2)
+        assert backend.predict_proba(X[-1:]).argmax() == 1
+    
+    def test_hist_gradient_boosting_small_update(self):
+        """Test a feedback-sized batch still moves boosted predictions"""
+        X, y = PhishingDetector._create_training_data()
+        backend = create_backend("hist_gradient_boosting").fit(X, y)
+        X_new, y_new = np.vstack([X[:10], X[-10:]]), 1 - np.concatenate([y[:10], y[-10:]])
+        updated = backend.partial_update(X_new, y_new, n_estimators=10)
+        
+        assert updated.estimator.n_iter_ == backend.estimator.n_iter_ + 10
+        assert updated.estimator.min_samples_leaf == backend.estimator.min_samples_leaf
+        before = backend.predict_proba(X_new)[:, 1]
+        after = updated.predict_proba(X_new)[:, 1]
+        assert (abs(after - y_new) < abs(before - y_new)).all()
+    
+    def test_unknown_backend(self):
+        """Test unknown backend names are rejected"""
+        with pytest.raises(ValueError):
+            create_backend("svm")
+
+
+class TestDetectorBackends:
+    """Test detector backend selection and persistence"""
+    
+    def test_detector_uses_configured_backend(self, tmp_path):
+        """Test the backend is selectable and survives a reload"""
+        detector = PhishingDetector(backend="hist_gradient_boosting", model_dir=tmp_path)
+        assert detector.backend.name == "hist_gradient_boosting"
+        
+        reloaded = PhishingDetector(model_dir=tmp_path)
+        assert reloaded.backend.name == "hist_gradient_boosting"
+        assert reloaded.model_version == detector.model_version
+    
+    def test_backend_mismatch_keeps_saved_model(self, tmp_path):
+        """Test a configured backend that differs from the saved model fails without retraining"""
+        PhishingDetector(backend="hist_gradient_boosting", model_dir=tmp_path)
+        model_bytes = (tmp_path / "phishing_model.pkl").read_bytes()
+        
+        detector = PhishingDetector(backend="random_forest", model_dir=tmp_path, autoload=False)
+        with pytest.raises(ValueError, match="MODEL_BACKEND"):
+            detector.ensure_loaded()
+        assert detector.backend is None
+        assert (tmp_path / "phishing_model.pkl").read_bytes() == model_bytes
+    
+    def test_legacy_model_is_wrapped(self, tmp_path):
+        """Test bare pickled estimators with a scaler still load"""
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+        
+        X, y = PhishingDetector._create_training_data()
+        scaler = StandardScaler().fit(X)
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X), y)
+        joblib.dump(model, tmp_path / "phishing_model.pkl")
+        joblib.dump(scaler, tmp_path / "scaler.pkl")
+        (tmp_path / "features.json").write_text("[]")
+        
+        detector = PhishingDetector(model_dir=tmp_path)
+        assert isinstance(detector.backend, RandomForestBackend)
+        assert detector.backend.scaler is not None
+        is_phishing, confidence, _ = detector.predict("http://1.2.3.4", {"is_ip": True, "domain_length": 15})
+        assert isinstance(is_phishing, bool)
+        assert 0.5 <= confidence <= 1.0
+    
+    def test_deferred_load_and_warm_up(self, tmp_path):
+        """Test autoload=False defers the model until first use"""
+        detector = PhishingDetector(backend="compact_forest", model_dir=tmp_path, autoload=False)
+        assert detector.backend is None
+        assert detector.warm_up({"has_ssl": True, "domain_length": 10}) > 0
+        assert isinstance(detector.backend, CompactForestBackend)
+        assert detector.ensure_loaded().backend is detector.backend
@@ -0,0 +1,136 @@
+"""
+Tests for the refresh-ahead probe result cache
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def make_cache(**kwargs):
+    clock = FakeClock()
+    calls = []
+    
+    async def loader(url):
+        calls.append(url)
+        return {"url": url, "version": len(calls)}
+    
+    options = {"ttl": 100.0, "refresh_ahead": 0.2, "stale_ttl": 30.0, "min_hits": 2, "jitter": 0.0}
+    options.update(kwargs)
+    return ResultCache(loader, clock=clock, **options), clock, calls
+
+
+class TestResultCache:
+    """Test TTL, stale-while-revalidate and refresh-ahead behaviour"""
+    
+    def test_miss_then_hit_by_canonical_url(self):
+        """Test equivalent URL spellings share one entry"""
+        cache, _, calls = make_cache()
+        
+        async def run():
+            assert cache.get("https://Example.com/") is None
+            await cache.load("https://Example.com/")
+            return cache.get("https://example.com")
+        
+        assert asyncio.run(run())["version"] == 1
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+    
+    def test_concurrent_misses_share_one_load(self):
+        """Test a burst of misses for one URL probes it once"""
+        cache, _, calls = make_cache()
+        
+        async def run():
+            return await asyncio.gather(*(cache.load("https://example.com") for _ in range(5)))
+        
+        assert len(asyncio.run(run())) == 5
+        assert len(calls) == 1
+    
+    def test_hot_entry_refreshes_before_expiry(self):
+        """Test hits in the refresh window reload in the background"""
+        cache, clock, calls = make_cache()
+        
+        async def run():
+            await cache.load("https://example.com")
+            cache.get("https://example.com")
+            clock.now = 90.0  # past the refresh point, before expiry
+            assert cache.get("https://example.com")["version"] == 1
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return cache.get("https://example.com")
+        
+        assert asyncio.run(run())["version"] == 2
+        assert cache.stats()["refreshes"] == 1
+    
+    def test_cold_entry_expires(self):
+        """Test entries with few hits are not refreshed or served stale"""
+        cache, clock, calls = make_cache(min_hits=3)
+        
+        async def run():
+            await cache.load("https://example.com")
+            clock.now = 101.0
+            return cache.get("https://example.com")
+        
+        assert asyncio.run(run()) is None
+        assert len(calls) == 1
+    
+    def test_hot_entry_served_stale_while_refreshing(self):
+        """Test an expired hot entry is returned immediately and reloaded"""
+        cache, clock, calls = make_cache()
+        
+        async def run():
+            await cache.load("https://example.com")
+            cache.get("https://example.com")
+            clock.now = 110.0  # expired but within stale_ttl
+            stale = cache.get("https://example.com")
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return stale, cache.get("https://example.com")
+        
+        stale, fresh = asyncio.run(run())
+        assert stale["version"] == 1
+        assert fresh["version"] == 2
+        assert cache.stats()["stale_hits"] == 1
+    
+    def test_failed_probe_expires_quickly(self):
+        """Test failed probes use the short TTL and are never served stale"""
+        cache, clock, _ = make_cache(error_ttl=10.0)
+        cache.put("https://timeout.example.com", {"has_ssl": False, "error": "timed out", "probe_failed": True})
+        cache.put("https://self-signed.example.com", {"has_ssl": False, "error": "certificate verify failed",
+                                                     "probe_failed": False})
+        for _ in range(3):
+            cache.get("https://timeout.example.com")
+        
+        clock.now = 12.0
+        assert cache.get("https://timeout.example.com") is None
+        assert cache.get("https://self-signed.example.com") is not None
+    
+    def test_refresh_points_are_spread(self):
+        """Test jitter spreads refreshes for entries stored together"""
+        cache, _, _ = make_cache(jitter=0.1)
+        for i in range(50):
+            cache.put(f"https://site{i}.example.com", {})
+        refresh_points = {round(entry.refresh_at, 3) for entry in cache._entries.values()}
+        assert len(refresh_points) > 40
+    
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted at capacity"""
+        cache, _, _ = make_cache(max_entries=2)
+        cache.put("https://a.example.com", {})
+        cache.put("https://b.example.com", {})
+        cache.get("https://a.example.com")
+        cache.put("https://c.example.com", {})
+        assert cache.get("https://b.example.com") is None
+        assert cache.get("https://a.example.com") is not None
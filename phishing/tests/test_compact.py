@@ -0,0 +1,82 @@
+"""
+Tests for the compact forest artifact
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml_model.backends import RandomForestBackend
+from ml_model.compact import CompactForest, compact_forest
+from ml_model.detector import PhishingDetector
+
+
+@pytest.fixture(scope="module")
+def forest_backend():
+    X, y = PhishingDetector._create_training_data()
+    return RandomForestBackend(n_estimators=30).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def probe_rows():
+    X, _ = PhishingDetector._create_training_data()
+    rng = np.random.default_rng(0)
+    return np.abs(X + rng.normal(0, 5, X.shape))
+
+
+class TestCompactForest:
+    """Test compact export fidelity and footprint"""
+    
+    def test_matches_sklearn_probabilities(self, forest_backend, probe_rows):
+        """Test pruning and narrow types preserve predictions"""
+        forest = compact_forest(forest_backend.estimator)
+        expected = forest_backend.predict_proba(probe_rows)
+        assert np.allclose(forest.predict_proba(probe_rows), expected, atol=1e-6)
+    
+    def test_pruning_removes_redundancy(self, forest_backend):
+        """Test duplicate trees and redundant splits are dropped"""
+        full = compact_forest(forest_backend.estimator, prune=False)
+        pruned = compact_forest(forest_backend.estimator)
+        assert pruned.n_trees <= full.n_trees
+        assert pruned.n_nodes < sum(t.tree_.node_count for t in forest_backend.estimator.estimators_)
+        assert pruned.tree_weight.sum() == 30
+        assert pruned.threshold.dtype == np.float32
+        assert pruned.left.dtype == np.int16
+    
+    def test_round_trip(self, forest_backend, probe_rows, tmp_path):
+        """Test save and load produce an identical evaluator"""
+        forest = compact_forest(forest_backend.estimator, metadata={"source_model_version": "abc"})
+        forest.save(tmp_path / "model.npz")
+        loaded = CompactForest.load(tmp_path / "model.npz")
+        assert loaded.metadata == {"source_model_version": "abc"}
+        assert np.array_equal(loaded.predict_proba(probe_rows), forest.predict_proba(probe_rows))
+    
+    def test_detector_compact_backend(self, tmp_path):
+        """Test the detector serves from the compact artifact"""
+        PhishingDetector(backend="random_forest", model_dir=tmp_path)
+        detector = PhishingDetector(backend="compact_forest", model_dir=tmp_path)
+        assert (tmp_path / "phishing_model.npz").exists()
+        is_phishing, _, _ = detector.predict("http://1.2.3.4", {"is_ip": True, "domain_length": 15, "redirect_count": 3})
+        assert isinstance(is_phishing, bool)
+    
+    def test_failed_export_is_not_replaced(self, tmp_path, monkeypatch):
+        """Test a forest that cannot be compacted fails loading instead of retraining"""
+        import ml_model.compact
+        
+        PhishingDetector(backend="random_forest", model_dir=tmp_path)
+        model_bytes = (tmp_path / "phishing_model.pkl").read_bytes()
+        
+        def oversized(*args, **kwargs):
+            raise ValueError("Tree too large for int16 node indices")
+        monkeypatch.setattr(ml_model.compact, "export_backend", oversized)
+        
+        detector = PhishingDetector(backend="compact_forest", model_dir=tmp_path, autoload=False)
+        with pytest.raises(ValueError, match="Tree too large"):
+            detector.ensure_loaded()
+        assert detector.backend is None
+        assert not (tmp_path / "phishing_model.npz").exists()
+        assert (tmp_path / "phishing_model.pkl").read_bytes() == model_bytes
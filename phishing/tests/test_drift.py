@@ -0,0 +1,95 @@
+"""
+Tests for feature-drift monitoring
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml_model.detector import PhishingDetector
+from ml_model.drift import DriftMonitor, FeatureBaseline, drift_status
+
+NAMES = ["domain_length", "has_ssl"]
+
+
+def training_matrix(rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.normal(12, 3, rows).round(), rng.random(rows) < 0.9]).astype(float)
+
+
+class TestFeatureBaseline:
+    """Test baseline histograms"""
+    
+    def test_round_trip(self, tmp_path):
+        """Test baselines survive save and load"""
+        baseline = FeatureBaseline.from_matrix(training_matrix(), NAMES)
+        baseline.save(tmp_path / "feature_baseline.json")
+        loaded = FeatureBaseline.load(tmp_path / "feature_baseline.json")
+        assert loaded.feature_names == NAMES
+        assert loaded.rows == 5000
+        np.testing.assert_allclose(loaded.edges[0], baseline.edges[0])
+        np.testing.assert_allclose(loaded.proportions[1], baseline.proportions[1], atol=1e-6)
+    
+    def test_discrete_feature_bins_per_value(self):
+        """Test binary features get one bin per value plus overflow"""
+        baseline = FeatureBaseline.from_matrix(training_matrix(), NAMES)
+        assert baseline.edges[1].tolist() == [0.0, 1.0]
+        assert abs(baseline.proportions[1][1] - 0.9) < 0.02
+        assert baseline.proportions[1][2] == 0
+
+
+class TestDriftMonitor:
+    """Test PSI scoring of served traffic"""
+    
+    def test_same_distribution_is_stable(self):
+        """Test traffic like the training data scores low PSI"""
+        monitor = DriftMonitor(FeatureBaseline.from_matrix(training_matrix(), NAMES))
+        monitor.observe(training_matrix(seed=1))
+        report = monitor.report()
+        assert report["observations"] == 5000
+        assert all(f["status"] == "stable" for f in report["features"].values())
+    
+    def test_shifted_distribution_is_flagged(self):
+        """Test longer domains and fewer SSL sites raise PSI"""
+        monitor = DriftMonitor(FeatureBaseline.from_matrix(training_matrix(), NAMES))
+        shifted = training_matrix(seed=2)
+        shifted[:, 0] += 20  # beyond anything seen in training
+        shifted[:2500, 1] = 0
+        monitor.observe(shifted)
+        features = monitor.report()["features"]
+        assert features["domain_length"]["status"] == "significant"
+        assert features["has_ssl"]["psi"] > 0.25
+    
+    def test_insufficient_data(self):
+        """Test scores are withheld until enough rows arrive"""
+        monitor = DriftMonitor(FeatureBaseline.from_matrix(training_matrix(), NAMES), min_observations=100)
+        monitor.observe(training_matrix(rows=10))
+        assert monitor.report()["max_psi"] is None
+        assert drift_status(None) == "insufficient_data"
+    
+    def test_memory_is_constant(self):
+        """Test counts decay instead of growing without bound"""
+        monitor = DriftMonitor(FeatureBaseline.from_matrix(training_matrix(), NAMES), window=1000)
+        shape = monitor.counts.shape
+        for seed in range(10):
+            monitor.observe(training_matrix(rows=500, seed=seed))
+        assert monitor.counts.shape == shape
+        assert monitor.weight < 1000
+        assert monitor.counts.sum(axis=1).max() == monitor.weight
+
+
+class TestDetectorDrift:
+    """Test the detector saves baselines and observes predictions"""
+    
+    def test_trained_model_monitors_predictions(self, tmp_path):
+        """Test a freshly trained model writes a baseline and tracks served rows"""
+        detector = PhishingDetector(model_dir=tmp_path)
+        assert (tmp_path / "feature_baseline.json").exists()
+        detector.predict_batch([{"has_ssl": True, "domain_length": 10}] * 3)
+        assert detector.drift_monitor.observed == 3
+        
+        reloaded = PhishingDetector(model_dir=tmp_path)
+        assert reloaded.drift_monitor.baseline.feature_names == reloaded.feature_names
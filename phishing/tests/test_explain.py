@@ -0,0 +1,64 @@
+"""
+Tests for model-derived explanations
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml_model.backends import create_backend
+from ml_model.detector import PhishingDetector
+from ml_model.explain import TreeExplainer
+from ml_model.features import FEATURE_NAMES
+
+
+@pytest.fixture(scope="module")
+def backend():
+    X, y = PhishingDetector._create_training_data()
+    return create_backend("random_forest", n_estimators=20).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def rows():
+    X, _ = PhishingDetector._create_training_data()
+    return np.abs(X[::50] + np.random.default_rng(1).normal(0, 4, X[::50].shape))
+
+
+class TestTreeExplainer:
+    """Test tree-path contributions"""
+    
+    def test_contributions_sum_to_prediction(self, backend, rows):
+        """Test bias plus contributions reproduces the forest probability"""
+        explainer = TreeExplainer.from_backend(backend, FEATURE_NAMES)
+        explained = explainer.explain(rows)
+        totals = [explainer.bias + sum(c.values()) for c in explained]
+        assert np.allclose(totals, backend.predict_proba(rows)[:, 1], atol=1e-5)
+    
+    def test_batch_matches_single_rows(self, backend, rows):
+        """Test vectorized batches equal row-by-row explanations"""
+        batch = TreeExplainer.from_backend(backend, FEATURE_NAMES).explain(rows)
+        single = TreeExplainer.from_backend(backend, FEATURE_NAMES)
+        for row, expected in zip(rows, batch):
+            assert single.explain(row)[0] == pytest.approx(expected)
+    
+    def test_cache_reuses_results(self, backend, rows):
+        """Test repeated feature vectors are served from the cache"""
+        explainer = TreeExplainer.from_backend(backend, FEATURE_NAMES, cache_size=3)
+        first = explainer.explain(rows[:2])
+        assert explainer.explain(rows[:2])[0] is first[0]
+        explainer.explain(rows[2:6])
+        assert len(explainer._cache) == 3
+    
+    def test_boosted_contributions_sum_to_prediction(self, rows):
+        """Test gradient boosting paths decompose its probability too"""
+        X, y = PhishingDetector._create_training_data()
+        backend = create_backend("hist_gradient_boosting", max_iter=20).fit(X, y)
+        explainer = TreeExplainer.from_backend(backend, FEATURE_NAMES)
+        explained = explainer.explain(rows)
+        totals = [explainer.bias + sum(c.values()) for c in explained]
+        assert np.allclose(totals, backend.predict_proba(rows)[:, 1], atol=1e-6)
+        assert all(c["has_ssl"] > 0 for c in explainer.explain(X[-5:]))
@@ -0,0 +1,101 @@
+"""
+Tests for typosquat and brand-lookalike detection
+"""
+
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml_model.features import extract_lexical_features
+from ml_model.lookalike import DEFAULT_BRANDS_PATH, BrandIndex, skeleton, split_host
+
+BRANDS = ["paypal.com", "microsoft.com", "amazon.com", "google.com", "barclays.co.uk"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return BrandIndex(BRANDS)
+
+
+class TestNormalization:
+    """Test homoglyph and domain normalization"""
+    
+    def test_skeleton(self):
+        """Test digit, Cyrillic and multi-character substitutions"""
+        assert skeleton("paypa1") == "paypal"
+        assert skeleton("pаypal") == "paypal"  # Cyrillic a
+        assert skeleton("rnicrosoft") == "microsoft"
+    
+    def test_split_host(self):
+        """Test registrable label extraction with multi-label suffixes"""
+        assert split_host("login.barclays.co.uk") == (["login"], "barclays", "co.uk")
+        assert split_host("xn--pypal-4ve.com")[1] == "pаypal"
+
+
+class TestBrandIndex:
+    """Test lookalike matching"""
+    
+    @pytest.mark.parametrize("host, brand", [
+        ("paypa1-login.com", "paypal"),
+        ("xn--pypal-4ve.com", "paypal"),
+        ("paypal.com.account-verify.net", "paypal"),
+        ("micros0ft-update.com", "microsoft"),
+        ("amazom.com", "amazon"),
+    ])
+    def test_lookalikes_detected(self, index, host, brand):
+        """Test typosquats and homoglyph domains match their brand"""
+        result = index.check_host(host)
+        assert result["lookalike_brand"] == brand
+        assert result["brand_similarity"] >= 0.8
+    
+    @pytest.mark.parametrize("host", ["www.paypal.com", "login.barclays.co.uk", "example.org", "10.0.0.1"])
+    def test_legitimate_hosts(self, index, host):
+        """Test brand-owned and unrelated domains score zero"""
+        assert index.check_host(host)["brand_similarity"] == 0.0
+    
+    @pytest.mark.parametrize("host", [
+        "amazon.co.uk", "amazon.de", "ebay.de", "paypal.me", "user.github.io", "mail.yahoo.co.jp",
+        "outlook.office365.com", "live.bbc.co.uk", "office-depot.com", "apple-pie-recipes.com",
+        "lives.com", "alive.com", "chaser.com",
+    ])
+    def test_default_list_false_positives(self, host):
+        """Test owned country domains and everyday words are not flagged"""
+        index = BrandIndex.from_file(DEFAULT_BRANDS_PATH)
+        assert index.check_host(host)["brand_similarity"] < 0.75
+    
+    @pytest.mark.parametrize("host, brand", [
+        ("app1e.com", "apple"),
+        ("login.live.com.verify.net", "live"),
+        ("secure.amazon.co.uk.example.net", "amazon"),
+        ("paypal.github.io", "paypal"),
+    ])
+    def test_word_brands_and_embedded_domains(self, host, brand):
+        """Test word brands still match whole names and spelled-out brand domains"""
+        index = BrandIndex.from_file(DEFAULT_BRANDS_PATH)
+        assert index.check_host(host) == {"brand_similarity": 1.0, "lookalike_brand": brand}
+    
+    def test_sub_millisecond_at_scale(self):
+        """Test lookups stay sub-millisecond with tens of thousands of brands"""
+        rng = random.Random(0)
+        brands = [
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12))) + ".com"
+            for _ in range(30000)
+        ]
+        index = BrandIndex(brands + BRANDS)
+        hosts = ["paypa1-login.com", "secure-account-verify.example.com", "www.shop-online.co.uk"] * 100
+        start = time.perf_counter()
+        for host in hosts:
+            index.check_host(host)
+        assert (time.perf_counter() - start) / len(hosts) < 0.001
+    
+    def test_feature_extraction(self):
+        """Test the similarity feature reaches the model's feature dict"""
+        features = extract_lexical_features("https://paypa1-secure.com/login")
+        assert features["brand_similarity"] == 1.0
+        assert features["lookalike_brand"] == "paypal"
@@ -0,0 +1,95 @@
+"""
+Tests for request profiling
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.profiling import Profiler, StackSampler, record_stage, stage
+
+
+class TestProfiler:
+    """Test stage timing and slow-request capture"""
+    
+    def test_disabled_profiler_records_nothing(self):
+        """Test stages are no-ops without an active profile"""
+        profiler = Profiler(enabled=False, slow_threshold=0.0)
+        with profiler.profile("analyze") as profile:
+            with stage("predict"):
+                pass
+        assert profile is None
+        assert profiler.slow_records() == []
+    
+    def test_slow_request_keeps_stage_breakdown(self):
+        """Test requests over the threshold are captured with their stages"""
+        profiler = Profiler(enabled=True, sample_rate=0.0, slow_threshold=0.01)
+        with profiler.profile("analyze", url="https://example.com"):
+            with stage("probe"):
+                time.sleep(0.02)
+            with stage("predict"):
+                pass
+            record_stage("probe_queue", 0.005)
+        with profiler.profile("analyze", url="https://fast.example.com"):
+            pass
+        
+        records = profiler.slow_records()
+        assert len(records) == 1
+        assert records[0]["url"] == "https://example.com"
+        assert records[0]["stages_ms"]["probe"] >= 20
+        assert records[0]["stages_ms"]["probe_queue"] == 5.0
+        assert set(records[0]["stages_ms"]) == {"probe", "predict", "probe_queue"}
+        assert profiler.stats()["profiled_requests"] == 2
+    
+    def test_stages_follow_threadpool_work(self):
+        """Test stages timed inside probe threads land on the request"""
+        from fastapi.concurrency import run_in_threadpool
+        profiler = Profiler(enabled=True, sample_rate=0.0, slow_threshold=0.0)
+        
+        def probe():
+            with stage("ssl_probe"):
+                pass
+        
+        async def handle():
+            with profiler.profile("analyze"):
+                await run_in_threadpool(probe)
+        
+        asyncio.run(handle())
+        assert "ssl_probe" in profiler.slow_records()[0]["stages_ms"]
+    
+    def test_records_are_bounded(self):
+        """Test only the newest max_records slow requests are kept"""
+        profiler = Profiler(enabled=True, sample_rate=0.0, slow_threshold=0.0, max_records=3)
+        for i in range(5):
+            with profiler.profile("analyze", n=i):
+                pass
+        assert [r["n"] for r in profiler.slow_records()] == [4, 3, 2]
+
+
+class TestStackSampler:
+    """Test stack sampling windows"""
+    
+    def test_samples_busy_thread(self):
+        """Test a busy thread's stack appears in the sampled window"""
+        sampler = StackSampler(interval=0.001)
+        stop = threading.Event()
+        
+        def busy_loop():
+            while not stop.is_set():
+                sum(range(1000))
+        
+        worker = threading.Thread(target=busy_loop)
+        sampler.start()
+        started = time.perf_counter()
+        worker.start()
+        time.sleep(0.1)
+        stop.set()
+        worker.join()
+        sampler.stop()
+        
+        stacks = sampler.window(started, time.perf_counter())
+        assert any("busy_loop" in s["stack"] for s in stacks)
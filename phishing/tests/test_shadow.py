@@ -0,0 +1,127 @@
+"""
+Tests for shadow evaluation of candidate models
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml_model.backends import ModelBackend, create_backend
+from ml_model.detector import PhishingDetector
+from ml_model.shadow import ShadowEvaluator, load_candidate
+
+SAFE = {"has_ssl": True, "domain_length": 10}
+PHISHING = {"is_ip": True, "domain_length": 15, "has_redirects": True, "redirect_count": 3}
+
+
+class AlwaysPhishing(ModelBackend):
+    name = "always_phishing"
+    
+    def predict_proba(self, X):
+        return np.tile([0.0, 1.0], (len(X), 1))
+
+
+@pytest.fixture(scope="module")
+def detector(tmp_path_factory):
+    return PhishingDetector(model_dir=tmp_path_factory.mktemp("primary"))
+
+
+def wait_for(evaluator, scored, timeout=10.0):
+    deadline = time.time() + timeout
+    while evaluator.stats()["scored"] < scored and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestShadowEvaluator:
+    """Test sampling, scoring and comparison"""
+    
+    def test_candidate_scores_sampled_traffic(self, detector):
+        """Test sampled rows are scored off the request path"""
+        evaluator = ShadowEvaluator(detector, lambda: (AlwaysPhishing(), None), sample_rate=1.0)
+        evaluator.start()
+        try:
+            features = [SAFE, PHISHING, SAFE]
+            evaluator.submit(features, detector.predict_batch(features))
+            wait_for(evaluator, 3)
+        finally:
+            evaluator.stop()
+        
+        stats = evaluator.stats()
+        assert stats["candidate_loaded"] and stats["scored"] == 3
+        assert stats["candidate_phishing_rate"] == 1.0
+        assert stats["disagreements"] == stats["safe_to_phishing"] == 3 - stats["served_phishing"]
+        assert stats["latency_us_per_row"]["candidate"]["p50"] is not None
+    
+    def test_identical_candidate_agrees(self, detector):
+        """Test the served model as its own candidate never disagrees"""
+        evaluator = ShadowEvaluator(detector, lambda: (detector.backend, detector.feature_names), sample_rate=1.0)
+        evaluator.candidate, evaluator.candidate_features = evaluator.loader()
+        features = [SAFE, PHISHING] * 5
+        evaluator.submit(features, detector.predict_batch(features))
+        evaluator.evaluate(evaluator._next_batch())
+        stats = evaluator.stats()
+        assert stats["scored"] == 10
+        assert stats["disagreement_rate"] == 0.0
+        assert stats["mean_probability_delta"] < 1e-6
+    
+    def test_full_queue_drops_samples(self, detector):
+        """Test submit never blocks when the worker falls behind"""
+        evaluator = ShadowEvaluator(detector, lambda: (AlwaysPhishing(), None), sample_rate=1.0, max_queue=2)
+        features = [SAFE] * 5
+        evaluator.submit(features, detector.predict_batch(features))
+        assert evaluator.stats()["sampled"] == 5
+        assert evaluator.stats()["dropped"] == 3
+    
+    def test_sampling_rate(self, detector):
+        """Test only a fraction of traffic is queued"""
+        evaluator = ShadowEvaluator(detector, lambda: (AlwaysPhishing(), None), sample_rate=0.0)
+        evaluator.submit([SAFE] * 10, detector.predict_batch([SAFE] * 10))
+        assert evaluator.stats()["sampled"] == 0
+    
+    def test_load_failure_is_reported(self, detector, tmp_path):
+        """Test a missing candidate file disables evaluation with an error"""
+        evaluator = ShadowEvaluator(detector, lambda: load_candidate(tmp_path / "missing.pkl"))
+        evaluator.start()
+        evaluator.stop()
+        assert "Cannot load candidate model" in evaluator.stats()["error"]
+
+
+class TestLoadCandidate:
+    """Test candidate model files"""
+    
+    def test_pickled_backend_with_features(self, tmp_path):
+        """Test pickled backends load with their feature list"""
+        X, y = PhishingDetector._create_training_data()
+        joblib.dump(create_backend("hist_gradient_boosting").fit(X, y), tmp_path / "candidate.pkl")
+        (tmp_path / "features.json").write_text('["has_ssl"]')
+        backend, feature_names = load_candidate(tmp_path / "candidate.pkl")
+        assert backend.name == "hist_gradient_boosting"
+        assert feature_names == ["has_ssl"]
+    
+    def test_legacy_pickle_uses_sibling_scaler(self, tmp_path):
+        """Test bare estimators trained on scaled features load with their scaler"""
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
+        
+        X, y = PhishingDetector._create_training_data()
+        scaler = StandardScaler().fit(X)
+        model = RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X), y)
+        joblib.dump(model, tmp_path / "candidate.pkl")
+        joblib.dump(scaler, tmp_path / "scaler.pkl")
+        backend, _ = load_candidate(tmp_path / "candidate.pkl")
+        assert backend.scaler is not None
+        assert np.array_equal(backend.predict_proba(X), model.predict_proba(scaler.transform(X)))
+    
+    def test_compact_model(self, tmp_path):
+        """Test compact .npz candidates load without pickles"""
+        X, y = PhishingDetector._create_training_data()
+        create_backend("compact_forest").fit(X, y).save(tmp_path / "candidate.npz")
+        backend, feature_names = load_candidate(tmp_path / "candidate.npz")
+        assert backend.predict_proba(X[:2]).shape == (2, 2)
+        assert feature_names is None
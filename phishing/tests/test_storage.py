@@ -0,0 +1,69 @@
+"""
+Tests for the write-behind analysis history store
+"""
+
+import pytest
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.storage import AnalysisStore, canonicalize_url
+
+
+class TestCanonicalization:
+    """Test URL canonicalization"""
+    
+    def test_equivalent_urls_share_key(self):
+        """Test case, default port, trailing slash and fragment are normalized"""
+        assert canonicalize_url("HTTPS://PayPal.com:443/#x") == "https://paypal.com"
+        assert canonicalize_url("https://paypal.com/") == "https://paypal.com"
+    
+    def test_query_and_port_preserved(self):
+        """Test meaningful URL parts are kept"""
+        assert canonicalize_url("http://a.com:8080/p?q=1") == "http://a.com:8080/p?q=1"
+
+
+class TestAnalysisStore:
+    """Test batched persistence and lookups"""
+    
+    def test_batched_writes_and_lookups(self, tmp_path):
+        """Test queued records are flushed and queryable"""
+        store = AnalysisStore(f"sqlite:///{tmp_path / 'history.db'}", batch_size=10)
+        for i in range(25):
+            store.record(
+                url=f"https://evil-{i % 2}.com/login",
+                is_phishing=True,
+                confidence=90.0,
+                risk_score=0.8,
+                threat_level="HIGH",
+                model_version="abc",
+                features={"domain_length": 10},
+                analyzed_at=1000.0 + i,
+            )
+        store.flush()
+        
+        assert store.stats()["written"] == 25
+        latest = store.lookup_url("https://EVIL-0.com/login", limit=1)
+        assert latest[0]["analyzed_at"] == 1024.0
+        assert latest[0]["features"] == {"domain_length": 10}
+        
+        window = store.domain_history("evil-1.com", since=1010.0, until=1020.0)
+        assert [r["analyzed_at"] for r in window] == [1019.0, 1017.0, 1015.0, 1013.0, 1011.0]
+        store.close()
+    
+    def test_background_flush(self):
+        """Test the writer thread persists records without an explicit flush"""
+        store = AnalysisStore("sqlite:///:memory:", flush_interval=0.05)
+        store.record("https://a.com", False, 99.0, 0.1, "LOW")
+        deadline = time.time() + 2
+        while store.stats()["written"] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(store.lookup_url("https://a.com")) == 1
+        store.close()
+    
+    def test_unsupported_url(self):
+        """Test non-sqlite URLs are rejected"""
+        with pytest.raises(ValueError):
+            AnalysisStore("postgresql://db/phishguard")
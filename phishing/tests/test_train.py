@@ -0,0 +1,88 @@
+"""
+Tests for the streaming training pipeline
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ml_model.detector import PhishingDetector
+from ml_model.features import FEATURE_NAMES
+from ml_model.train import cache_key, extract_chunk, parse_label, train
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    lines = ["url,label,redirect_count"]
+    for i in range(60):
+        lines.append(f"https://www.site{i}.com/,legitimate,")
+        lines.append(f"http://{i}.10.20.30/secure-login/@verify!,phishing,{i % 4}")
+    lines.append("https://broken.example,maybe,")
+    path = tmp_path / "feed.csv"
+    path.write_text("\n".join(lines))
+    return path
+
+
+class TestFeatureExtraction:
+    """Test chunk feature extraction"""
+    
+    def test_labels(self):
+        """Test label spellings are normalized"""
+        assert parse_label("Phishing") == 1
+        assert parse_label("0") == 0
+        with pytest.raises(ValueError):
+            parse_label("unknown")
+    
+    def test_bad_rows_are_skipped(self):
+        """Test unparseable rows are dropped rather than failing the chunk"""
+        X, y = extract_chunk([
+            {"url": "example.com", "label": "0"},
+            {"url": "http://1.2.3.4/", "label": "??"},
+        ])
+        assert X.shape == (1, len(FEATURE_NAMES))
+        assert X[0, 0] == 1.0  # https scheme assumed for bare domains
+        assert list(y) == [0]
+
+
+class TestTrainingPipeline:
+    """Test end-to-end training"""
+    
+    def test_train_publishes_model(self, corpus, tmp_path):
+        """Test training writes artifacts the detector can load"""
+        output = tmp_path / "model"
+        output.mkdir()
+        metrics = train([corpus], output_dir=output, chunk_size=25, workers=2)
+        
+        assert metrics["train_rows"] + metrics["holdout_rows"] == 120
+        assert metrics["accuracy"] > 0.9
+        assert json.loads((output / "training_metrics.json").read_text())["model_version"]
+        assert (output / "feature_baseline.json").exists()
+        
+        detector = PhishingDetector(model_dir=output)
+        assert detector.model_version == metrics["model_version"]
+    
+    def test_feature_cache_reused(self, corpus, tmp_path):
+        """Test a second run reads cached columns instead of re-extracting"""
+        cache = tmp_path / "cache"
+        train([corpus], output_dir=tmp_path, cache_dir=cache, chunk_size=25, workers=1)
+        entries = list(cache.iterdir())
+        assert len(entries) == 1
+        assert (entries[0] / "domain_length.bin").exists()
+        
+        mtime = (entries[0] / "meta.json").stat().st_mtime_ns
+        train([corpus], output_dir=tmp_path, cache_dir=cache, workers=1)
+        assert (entries[0] / "meta.json").stat().st_mtime_ns == mtime
+    
+    def test_brand_list_change_invalidates_cache(self, corpus, tmp_path, monkeypatch):
+        """Test editing the protected brand list changes the feature cache key"""
+        brands = tmp_path / "brands.txt"
+        brands.write_text("paypal.com\n")
+        monkeypatch.setenv("PROTECTED_BRANDS_PATH", str(brands))
+        key = cache_key(corpus)
+        
+        brands.write_text("paypal.com\nexample-bank.com\n")
+        assert cache_key(corpus) != key
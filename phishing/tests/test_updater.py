@@ -0,0 +1,113 @@
+"""
+Tests for incremental model updates from analyst feedback
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.storage import AnalysisStore
+from ml_model.detector import PhishingDetector
+from ml_model.updater import IncrementalUpdater
+
+PHISHY = {"is_ip": True, "domain_length": 15, "path_length": 25, "has_query": True,
+          "special_chars_in_path": 3, "has_redirects": True, "redirect_count": 2, "has_numbers": True}
+SAFE = {"has_ssl": True, "domain_length": 10, "path_length": 1, "has_numbers": True}
+
+
+@pytest.fixture
+def setup(tmp_path):
+    detector = PhishingDetector(backend="random_forest", model_dir=tmp_path)
+    store = AnalysisStore("sqlite:///:memory:")
+    updater = IncrementalUpdater(detector, store, min_examples=10, trees_per_update=5)
+    yield detector, store, updater
+    store.close()
+
+
+class TestIncrementalUpdater:
+    """Test feedback-driven model refreshes"""
+    
+    def test_waits_for_enough_examples(self, setup):
+        """Test no update runs below the minimum batch size"""
+        detector, store, updater = setup
+        store.add_feedback("https://a.com", False, PHISHY)
+        assert updater.run_once() is False
+        assert updater.pending() == 1
+    
+    def test_single_label_uses_replay(self, setup, monkeypatch):
+        """Test false-positive-only batches wait for, then use, replay examples"""
+        detector, store, updater = setup
+        for i in range(10):
+            store.add_feedback(f"https://fp{i}.com", False, PHISHY)
+        assert updater.run_once() is False
+        
+        for i in range(10):
+            store.add_feedback(f"http://bad{i}.com", True, SAFE)
+        assert updater.run_once() is True
+        
+        replayed = []
+        recent_feedback = store.recent_feedback
+        def spy(*args):
+            rows = recent_feedback(*args)
+            replayed.extend(rows)
+            return rows
+        monkeypatch.setattr(store, "recent_feedback", spy)
+        
+        for i in range(10):
+            store.add_feedback(f"https://fp-more{i}.com", False, PHISHY)
+        assert updater.run_once() is True
+        assert len(replayed) == 10
+        assert all(row["is_phishing"] for row in replayed)
+        assert updater.pending() == 0
+    
+    def test_update_publishes_new_model(self, setup, tmp_path):
+        """Test updates add trees, advance the watermark and reach other workers"""
+        detector, store, updater = setup
+        other_worker = PhishingDetector(model_dir=tmp_path)
+        version = detector.model_version
+        
+        for i in range(10):
+            store.add_feedback(f"https://fp{i}.com", False, PHISHY)
+            store.add_feedback(f"http://tp{i}.com", True, SAFE)
+        assert updater.run_once() is True
+        
+        assert len(detector.model.estimators_) == 105
+        assert detector.model_version != version
+        assert updater.pending() == 0
+        assert other_worker.reload_if_changed() is True
+        assert other_worker.model_version == detector.model_version
+    
+    def test_backend_without_updates_is_skipped(self, setup, monkeypatch):
+        """Test backends without partial_update report it instead of failing every interval"""
+        from ml_model.backends import create_backend
+        
+        detector, store, updater = setup
+        monkeypatch.setattr(detector, "backend", create_backend("compact_forest"))
+        for i in range(10):
+            store.add_feedback(f"https://fp{i}.com", False, PHISHY)
+        assert updater.run_once() is False
+        stats = updater.stats()
+        assert stats["supported"] is False
+        assert "does not support" in stats["last_error"]
+    
+    def test_leader_builds_on_newly_published_model(self, setup, tmp_path):
+        """Test the updating worker reloads a model published elsewhere before extending it"""
+        import os
+        from ml_model.backends import create_backend
+        
+        detector, store, updater = setup
+        X, y = PhishingDetector._create_training_data()
+        retrained = create_backend("random_forest", n_estimators=20).fit(X, y)
+        PhishingDetector(model_dir=tmp_path, autoload=False).publish(retrained)
+        # Make the new file visible even on filesystems with coarse mtimes
+        stat = (tmp_path / "phishing_model.pkl").stat()
+        os.utime(tmp_path / "phishing_model.pkl", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        
+        for i in range(10):
+            store.add_feedback(f"https://fp{i}.com", False, PHISHY)
+            store.add_feedback(f"http://tp{i}.com", True, SAFE)
+        assert updater.run_once() is True
+        assert len(detector.model.estimators_) == 25